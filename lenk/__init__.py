@@ -1,8 +1,14 @@
 """Lenk project package (Django-like layout).
 
-Exports the viewer app's main entry points for convenience.
+Exports the viewer app's main entry points for convenience. They are
+imported on first access so `import lenk` doesn't pull in Tk.
 """
 
-from .apps.viewer.app import FileViewer, main
-
 __all__ = ["FileViewer", "main"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        from .apps.viewer import app
+        return getattr(app, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,231 @@
 #!/usr/bin/env python3
 """Tkinter application wiring for the Lenk file viewer."""
+import atexit
+import bisect
+import hashlib
+import itertools
 import os
+import queue
+import re
+import stat
+import sys
+import threading
 import tkinter as tk
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from operator import attrgetter, itemgetter
 from tkinter import ttk, filedialog
 
 from .comments import CommentAudioMixin
 from .database import DatabaseMixin
 from .navigation import NavigationStateMixin
 
+# Zero-width split point before every line that starts a heading cell
+_CELL_SPLIT_RE = re.compile(r'^(?=#)', re.MULTILINE)
+
+# Inline markup in priority order; each group is named after the text tag it renders with
+_INLINE_RE = re.compile(
+    r"`(?P<inline_code>[^`]+)`"
+    r"|\*\*(?P<bold>[^*]+)\*\*"
+    r"|(?<!\*)\*(?P<italic>[^*]+)\*(?!\*)"
+    r"|\[(?P<link>[^\]]+)\]\([^)]+\)"
+)
+
+# Files are read at most this far; larger files show a truncation note
+_MAX_READ_BYTES = 5 * 1024 * 1024
+
+# Common fonts shared by the controls and text tags
+_FONT_UI = ('Consolas', 10)
+_FONT_UI_BOLD = ('Consolas', 10, 'bold')
+_FONT_SMALL = ('Consolas', 9)
+
+# Root window shortcuts: (event sequence, FileViewer method name)
+_ROOT_BINDINGS = (
+    # Arrow keys drive markdown cell navigation
+    ('<Up>', 'on_arrow_key'),
+    ('<Down>', 'on_arrow_key'),
+    ('<Left>', 'on_arrow_key'),
+    ('<Right>', 'on_arrow_key'),
+    ('<Command-slash>', 'toggle_focus'),
+    ('<Command-r>', 'refresh_tree_manual'),
+    ('<Command-Shift-Up>', 'read_previous_comment'),  # Read the previous comment aloud
+    ('<Command-Shift-Down>', 'read_next_comment'),  # Read the next comment aloud
+    ('<Command-Shift-Left>', 'stop_comment_dictation'),
+    ('<Command-k>', 'show_shortcuts'),
+)
+
+# Markdown -> speakable text, applied in order by clean_text_for_reading
+_TTS_CLEANUP = (
+    (re.compile(r'```[\s\S]*?```'), ''),  # Code blocks, entirely
+    (re.compile(r'`[^`]+`'), ''),  # Inline code
+    (re.compile(r'^#{1,6}\s+', re.MULTILINE), ''),  # Heading markers (keep the text)
+    (re.compile(r'\*\*\*(.+?)\*\*\*'), r'\1'),  # Bold+italic
+    (re.compile(r'\*\*(.+?)\*\*'), r'\1'),  # Bold
+    (re.compile(r'\*(.+?)\*'), r'\1'),  # Italic
+    (re.compile(r'__(.+?)__'), r'\1'),  # Bold (underscore)
+    (re.compile(r'_(.+?)_'), r'\1'),  # Italic (underscore)
+    (re.compile(r'\[([^\]]+)\]\([^\)]+\)'), r'\1'),  # Links (keep text)
+    (re.compile(r'!\[([^\]]*)\]\([^\)]+\)'), ''),  # Images
+    (re.compile(r'^[-*_]{3,}$', re.MULTILINE), ''),  # Horizontal rules
+    (re.compile(r'^>\s+', re.MULTILINE), ''),  # Blockquote markers
+    (re.compile(r'^\s*[-*+]\s+', re.MULTILINE), ''),  # List markers (keep content)
+    (re.compile(r'^\s*\d+\.\s+', re.MULTILINE), ''),
+    (re.compile(r'<[^>]+>'), ''),  # HTML tags
+    (re.compile(r'~~(.+?)~~'), r'\1'),  # Strikethrough
+    (re.compile(r'\n{3,}'), '\n\n'),  # Excess blank lines (keep paragraph breaks)
+    (re.compile(r'[ \t]+'), ' '),
+)
+
+# A stripped line without any of these is returned unchanged by _TTS_CLEANUP
+_TTS_MARKUP_RE = re.compile(r'[`#*_\[!\->+<~\t]|  |^\d')
+
+# Leading heading marker on a single line
+_HEADING_MARK_RE = re.compile(r'^#{1,6}\s+')
+
+# Remembered-open folders listed per idle callback while restoring tree state
+_EXPANSIONS_PER_PASS = 8
+
+# Folder entries inserted per page; the rest wait behind a '… more items' row
+_TREE_PAGE_SIZE = 500
+
+# Bindtag shared by the directory and favorites trees
+_TREE_BINDTAG = 'LenkTree'
+
+# Tags for top-level rows in the favorites tree
+_FAVORITE_TAGS = ('favorite',)
+
+# Appended to anything cut off at _MAX_READ_BYTES
+_TRUNCATED_NOTE = f"[File truncated - showing first {_MAX_READ_BYTES // 1024} KB]"
+
+# Parsed markdown kept for reopening: entry count, and the largest file worth holding
+_FILE_CACHE_ENTRIES = 32
+_FILE_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+# Comment block written under a cell in the annotated export
+_COMMENT_EXPORT_HEADER = "\n\n---\n\n**💬 Comments:**\n\n"
+_COMMENT_EXPORT_TPL = "\n> **Comment** ({created_at}){marker}:\n> {text}"
+_COMMENT_EXPORT_FOOTER = "\n\n---\n"
+
+# Files longer than this are sent to the AI as the cells around the current one, capped to this size
+_CHAT_CONTEXT_CHARS = 8 * 1024
+_CHAT_CONTEXT_CELLS = 3
+
+# Plain-text views are filled this many characters per idle callback
+_INSERT_CHUNK_CHARS = 64 * 1024
+
+# Cells longer than this are shown as one unformatted block instead of parsed markdown
+_PLAIN_CELL_CHARS = 200_000
+_PLAIN_CELL_NOTE = "[Large cell - shown without markdown formatting]\n"
+
+# Parsed Python outlines kept for reopening unchanged sources
+_PY_OUTLINE_CACHE_ENTRIES = 16
+
+# Python snippet highlighting in the outline view
+_NEWLINE_RE = re.compile(r"\n")
+
+# One pass; whichever of string/comment starts first wins, so keywords inside them never match
+_PY_HIGHLIGHT_RE = re.compile(
+    r"(?s)(?P<str>'''.*?'''|\"\"\".*?\"\"\"|'[^'\n]*'|\"[^\"\n]*\")"
+    r"|(?P<com>#[^\n]*)"
+    r"|(?P<kw>\b(?:False|class|finally|is|return|None|continue|for|lambda|try|True|def|from|nonlocal|while|and|del|global|not|with|as|elif|if|or|yield|assert|else|import|pass|break|except|in|raise)\b)"
+)
+
+# Text tag per heading level (index = number of leading '#', capped at 6)
+_HEADING_TAGS = (None, 'h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+# Ordered list item: optional indent, digits, then a dot
+_OL_RE = re.compile(r'\s*\d+\.')
+
+
+def _split_markdown_cells(content):
+    """Split markdown into heading-delimited cells (safe to call off the Tk thread)."""
+    # Safety limit - don't parse files that are too large
+    if len(content) > 5 * 1024 * 1024:  # 5MB text limit
+        return ["[File too large to parse into cells - displaying as single block]", content[:100000]]
+
+    # Safety limit on number of lines
+    if content.count('\n') >= 50000:
+        content = '\n'.join(content.split('\n', 50000)[:50000])
+
+    # Split in C at every line starting with '#'; cell text must stay
+    # byte-identical to the line-based split because comments key on its hash
+    cells = _CELL_SPLIT_RE.split(content)
+    if len(cells) > 1 and not cells[0]:
+        cells.pop(0)
+    # Drop each cell's trailing newline in place, so only one cell is ever
+    # held twice instead of the whole split
+    for i in range(len(cells) - 1):
+        cells[i] = cells[i][:-1]
+
+    # Limit number of cells to prevent UI freeze
+    if len(cells) > 1000:
+        cells = cells[:1000] + ["[Remaining cells truncated - file too large]"]
+    return cells
+
+
+def _python_outline(content):
+    """Parse Python source into (line count, outline rows) for build_python_outline.
+
+    Each row is (text, values, docstring meta or None, child rows); raises
+    whatever ast.parse raises.
+    """
+    import ast
+    tree = ast.parse(content)
+
+    # Helper to get end lineno if available
+    def get_end_lineno(node):
+        return getattr(node, 'end_lineno', getattr(node, 'lineno', 1))
+
+    rows = []
+
+    # Limit top-level items to prevent UI freeze on huge files
+    max_top_level_items = 500
+    items_processed = 0
+
+    for node in tree.body:
+        if items_processed >= max_top_level_items:
+            # Add indicator that outline was truncated
+            rows.append((f"... ({len(tree.body) - items_processed} more items truncated)", ("truncated", 0, 0), None, ()))
+            break
+        items_processed += 1
+        if isinstance(node, ast.ClassDef):
+            doc = ast.get_docstring(node) or ""
+            methods = []
+            rows.append((f"class {node.name}", ("class", node.lineno, get_end_lineno(node)), {"doc": doc, "type": "class"}, methods))
+
+            # Limit methods per class to prevent UI freeze
+            max_methods_per_class = 100
+            methods_processed = 0
+
+            for sub in node.body:
+                if isinstance(sub, ast.FunctionDef) or isinstance(sub, ast.AsyncFunctionDef):
+                    if methods_processed >= max_methods_per_class:
+                        # Add indicator that methods were truncated
+                        remaining = sum(1 for s in node.body if isinstance(s, (ast.FunctionDef, ast.AsyncFunctionDef))) - methods_processed
+                        methods.append((f"... ({remaining} more methods truncated)", ("truncated", 0, 0), None, ()))
+                        break
+                    methods_processed += 1
+
+                    sdoc = ast.get_docstring(sub) or ""
+                    smark = "async def" if isinstance(sub, ast.AsyncFunctionDef) else "def"
+                    methods.append((f"{smark} {sub.name}()", ("method", sub.lineno, get_end_lineno(sub)), {"doc": sdoc, "type": "method"}, ()))
+        elif isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
+            doc = ast.get_docstring(node) or ""
+            mark = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+            rows.append((f"{mark} {node.name}()", ("function", node.lineno, get_end_lineno(node)), {"doc": doc, "type": "function"}, ()))
+        elif isinstance(node, ast.Assign):
+            # show top-level assignment names
+            names = []
+            for t in node.targets:
+                if isinstance(t, ast.Name):
+                    names.append(t.id)
+            if names:
+                text = ", ".join(names)
+                rows.append((f"const {text}", ("const", node.lineno, get_end_lineno(node)), None, ()))
+
+    return len(content.splitlines()), rows
+
 
 class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
     def __init__(self, root):
@@ -35,6 +253,8 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
 
         # Navigation state tracking
         self.tree_state_save_job = None
+        self._deferred_tree_expansions = []  # (tree, node, path, depth) awaiting lazy fill
+        self._deferred_expansion_job = None
         self.tree_open_paths = set()
         self.tree_selected_path = None
         self.favorites_open_paths = set()
@@ -58,8 +278,13 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         left_frame = tk.Frame(main_container, bg=self.bg_color)
         main_container.add(left_frame, width=300)
 
-        # Settings expanded state
+        # Settings expanded state, and the settings button style for each state
         self.settings_expanded = False
+        self._settings_built = False
+        self._settings_button_styles = {
+            False: {'bg': "#cccccc", 'fg': "#000000", 'font': _FONT_UI},
+            True: {'bg': self.button_color, 'fg': self.button_text_color, 'font': _FONT_UI_BOLD},
+        }
 
         # Favorites section at top (equal size with browser)
         favorites_frame = tk.Frame(left_frame, bg=self.bg_color)
@@ -97,14 +322,14 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         path_frame = tk.Frame(toolbar, bg=self.bg_color)
         path_frame.pack(fill=tk.X, pady=(0, 5))
 
-        tk.Label(path_frame, text="Path:", bg=self.bg_color, fg=self.fg_color, font=('Consolas', 10)).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Label(path_frame, text="Path:", bg=self.bg_color, fg=self.fg_color, font=_FONT_UI).pack(side=tk.LEFT, padx=(0, 5))
 
         self.path_entry = tk.Entry(
             path_frame,
             bg=self.border_color,
             fg=self.fg_color,
             insertbackground=self.fg_color,
-            font=('Consolas', 10),
+            font=_FONT_UI,
             relief=tk.FLAT,
             highlightthickness=1,
             highlightbackground=self.border_color,
@@ -121,14 +346,14 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             fg=self.button_text_color,
             activebackground=self.button_active_color,
             activeforeground=self.button_text_color,
-            font=('Consolas', 10, 'bold'),
+            font=_FONT_UI_BOLD,
             relief=tk.RAISED,
             padx=15,
             pady=2,
             cursor='hand2',
             borderwidth=1,
             highlightthickness=0,
-            command=lambda: self.navigate_to_path(None)
+            command=partial(self.navigate_to_path, None)
         )
         nav_button.pack(side=tk.LEFT)
 
@@ -143,7 +368,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             fg="#000000",
             activebackground="#aaaaaa",
             activeforeground="#000000",
-            font=('Consolas', 10),
+            font=_FONT_UI,
             relief=tk.RAISED,
             padx=15,
             pady=5,
@@ -177,7 +402,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             fg="#000000",
             activebackground="#aaaaaa",
             activeforeground="#000000",
-            font=('Consolas', 10),
+            font=_FONT_UI,
             relief=tk.RAISED,
             pady=8,
             cursor='hand2',
@@ -195,7 +420,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             fg="#000000",
             activebackground="#aaaaaa",
             activeforeground="#000000",
-            font=('Consolas', 10),
+            font=_FONT_UI,
             relief=tk.RAISED,
             pady=8,
             cursor='hand2',
@@ -239,7 +464,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             text="Select a file to view",
             bg=self.border_color,
             fg=self.fg_color,
-            font=('Consolas', 10),
+            font=_FONT_UI,
             anchor='w',
             padx=10,
             pady=5
@@ -264,98 +489,75 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         )
         self.text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        # Python outline + code viewer (lazy toggled)
-        self.py_frame = tk.PanedWindow(right_frame, orient=tk.HORIZONTAL, bg=self.bg_color, sashwidth=5, sashrelief=tk.FLAT)
-        # Left: outline tree
-        outline_container = tk.Frame(self.py_frame, bg=self.bg_color)
-        self.py_outline = ttk.Treeview(outline_container, selectmode='browse')
-        self.py_outline.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.py_frame.add(outline_container, width=280)
-
-        # Right: code/details
-        code_container = tk.Frame(self.py_frame, bg=self.bg_color)
-        self.py_text = tk.Text(
-            code_container,
-            bg=self.bg_color,
-            fg=self.fg_color,
-            insertbackground=self.fg_color,
-            selectbackground=self.select_color,
-            font=('Consolas', 11),
-            wrap=tk.NONE,
-            padx=10,
-            pady=10
-        )
-        self.py_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.py_frame.add(code_container)
-
-        # Hide Python view by default; shown for .py files
-        self.py_frame.pack_forget()
+        # Text tags are widget-global, so configure them once
+        self._configure_markdown_tags()
 
-        # Outline selection handler
-        self.py_outline.bind('<<TreeviewSelect>>', self.on_python_symbol_select)
+        # Python outline + code viewer, built by _ensure_py_frame on the first .py render
+        self._py_parent = right_frame
+        self.py_frame = None
 
         # Cache for docstrings and nodes
         self._py_outline_cache = {}
         self._py_current_content = None  # Cache Python file content to avoid re-reading
+        self._py_outline_rows = OrderedDict()  # sha256 of source -> _python_outline result, most recent last
+        self._file_cache = OrderedDict()  # path -> ((mtime_ns, size), cells, cell keys), most recent last
+        self._file_load_seq = 0  # Bumped per display_file so stale background reads are dropped
+        self._current_file_stamp = None  # (mtime_ns, size) of current_file when it was opened
+        self._load_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='lenk-read')
+        self._load_results = queue.Queue()  # (callback, args) posted by read workers
+        self._loads_in_flight = 0
+        self._favorites_seq = 0  # Bumped per populate_favorites so stale stat batches are dropped
+        self._favorites_items = {}  # starred path -> (top-level iid, is_dir) in the favorites tree
+        self._load_poll_job = None
+
+        # Folder nodes per tree whose 'Loading...' placeholder hasn't been expanded yet
+        self._lazy_nodes = {self.tree: set(), self.favorites_tree: set()}
+        # '… more items' rows per tree -> (remaining listing, depth, max_depth)
+        self._more_rows = {self.tree: {}, self.favorites_tree: {}}
+        # Folders listed into the directory tree -> st_mtime_ns when listed, and the root they belong to
+        self._dir_stamps = {}
+        self._tree_root = None
+
+        # Both trees share one bindtag (after their own), so each handler is registered
+        # with Tcl once; the handlers tell the trees apart via event.widget
+        for tree in (self.tree, self.favorites_tree):
+            tags = tree.bindtags()
+            tree.bindtags(tags[:1] + (_TREE_BINDTAG,) + tags[1:])
 
         # Bind tree selection events
-        self.tree.bind('<<TreeviewSelect>>', self.on_file_select)
-        self.tree.bind('<Button-2>', self.toggle_star)  # Right-click
-        self.tree.bind('<Button-3>', self.toggle_star)  # Right-click (alternative)
-        self.tree.bind('<Control-Button-1>', self.toggle_star)  # Ctrl+Click
-        self.tree.bind('<<TreeviewOpen>>', self.on_folder_open)
-        self.tree.bind('<<TreeviewClose>>', self.on_folder_close)
-
-        # Bind favorites tree selection events
-        self.favorites_tree.bind('<<TreeviewSelect>>', self.on_file_select)
-        self.favorites_tree.bind('<Button-2>', self.toggle_star)  # Right-click
-        self.favorites_tree.bind('<Button-3>', self.toggle_star)  # Right-click (alternative)
-        self.favorites_tree.bind('<Control-Button-1>', self.toggle_star)  # Ctrl+Click
-        self.favorites_tree.bind('<<TreeviewOpen>>', self.on_folder_open)
-        self.favorites_tree.bind('<<TreeviewClose>>', self.on_folder_close)
+        self.root.bind_class(_TREE_BINDTAG, '<<TreeviewSelect>>', self.on_file_select)
+        self.root.bind_class(_TREE_BINDTAG, '<Button-2>', self.toggle_star)  # Right-click
+        self.root.bind_class(_TREE_BINDTAG, '<Button-3>', self.toggle_star)  # Right-click (alternative)
+        self.root.bind_class(_TREE_BINDTAG, '<Control-Button-1>', self.toggle_star)  # Ctrl+Click
+        self.root.bind_class(_TREE_BINDTAG, '<<TreeviewOpen>>', self.on_folder_open)
+        self.root.bind_class(_TREE_BINDTAG, '<<TreeviewClose>>', self.on_folder_close)
 
         # Cell navigation for markdown
         self.cells = []  # List of cell content (text)
+        self._rendered_cells = {}  # cell index -> (content, Text.insert args)
         self.current_cell = 0
         self.current_file = None
         self.viewing_comments = False
+        self._ai_request_pending = False  # One @chat request at a time
+        self._openai_conn = None  # Kept-alive HTTPSConnection, created on the first @chat
+        self._openai_lock = threading.Lock()
+        self._pending_render = None  # after() id of a debounced cell render
         self.reading_mode = False
         self.tts_process = None
 
-        # Bind arrow keys globally
-        self.root.bind('<Up>', self.on_arrow_key)
-        self.root.bind('<Down>', self.on_arrow_key)
-        self.root.bind('<Left>', self.on_arrow_key)
-        self.root.bind('<Right>', self.on_arrow_key)
-
-        # Bind Command+/ to toggle focus
-        self.root.bind('<Command-slash>', self.toggle_focus)
+        # Global keyboard shortcuts (see _ROOT_BINDINGS)
+        for sequence, handler in _ROOT_BINDINGS:
+            self.root.bind(sequence, getattr(self, handler))
 
         # Bind Command+E to export annotated version (bind_all to ensure it fires)
         self.root.bind_all('<Command-e>', self.save_annotated_file)
 
-        # Bind Command+R to refresh tree
-        self.root.bind('<Command-r>', self.refresh_tree_manual)
-
-        # Bind Command+Shift+Up to read the previous comment aloud
-        self.root.bind('<Command-Shift-Up>', self.read_previous_comment)
-
-        # Bind Command+Shift+Down to read the next comment aloud
-        self.root.bind('<Command-Shift-Down>', self.read_next_comment)
-
-        # Bind Command+Shift+Left to stop comment dictation
-        self.root.bind('<Command-Shift-Left>', self.stop_comment_dictation)
-
-        # Bind Command+K to show shortcuts viewer
-        self.root.bind('<Command-k>', self.show_shortcuts)
-
         # Track which pane has focus
         self.focus_on_reader = False
 
         # Track comment reading state
         self.current_comment_reading_index = -1
         self.dictation_process = None  # Process for reading comments aloud
-        self.dictation_temp_file = None
 
         # Comment narration state
         self.narrate_comments = False  # Toggle for auto-narration
@@ -367,12 +569,37 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         self.populate_tree()
         self.populate_favorites()
 
-        # Restore previous session
-        self.restore_session()
+        # Restore previous session once the window has painted
+        self.root.after_idle(self.restore_session)
 
         # Reapply navigation state for tree views
         self.restore_navigation_state()
-        self.schedule_navigation_state_save()
+
+    def _configure_markdown_tags(self):
+        """Configure the reader's markdown/comment text tags (once, at startup)."""
+        self.text_widget.tag_configure('h1', font=('Consolas', 18, 'bold'), foreground='#569cd6', spacing3=10)
+        self.text_widget.tag_configure('h2', font=('Consolas', 16, 'bold'), foreground='#4ec9b0', spacing3=8)
+        self.text_widget.tag_configure('h3', font=('Consolas', 14, 'bold'), foreground='#4ec9b0', spacing3=6)
+        self.text_widget.tag_configure('h4', font=('Consolas', 12, 'bold'), foreground='#4ec9b0', spacing3=4)
+        self.text_widget.tag_configure('h5', font=('Consolas', 11, 'bold'), foreground='#4ec9b0', spacing3=4)
+        self.text_widget.tag_configure('h6', font=('Consolas', 11, 'bold'), foreground='#4ec9b0', spacing3=4)
+        self.text_widget.tag_configure('code_block', background='#2d2d2d', foreground='#ce9178', font=('Monaco', 10), lmargin1=16, lmargin2=16, spacing1=2, spacing3=6)
+        self.text_widget.tag_configure('blockquote', foreground='#6a9955', lmargin1=20, lmargin2=20)
+        self.text_widget.tag_configure('list_item', lmargin1=24, lmargin2=48, spacing1=1, spacing3=1)
+        self.text_widget.tag_configure('paragraph', spacing1=2, spacing3=6)
+        self.text_widget.tag_configure('inline_code', background='#2d2d2d', foreground='#ce9178', font=('Monaco', 10))
+        self.text_widget.tag_configure('bold', font=('Consolas', 11, 'bold'))
+        self.text_widget.tag_configure('italic', font=('Consolas', 11, 'italic'))
+        self.text_widget.tag_configure('link', foreground='#4aa3ff', underline=True)
+        self.text_widget.tag_configure('cell_indicator', foreground='#888888', font=_FONT_UI)
+        self.text_widget.tag_configure('separator', foreground='#444444')
+        self.text_widget.tag_configure('comment_hint', foreground='#ffd700')
+        self.text_widget.tag_configure('comment_header', foreground='#ffd700', font=('Consolas', 12, 'bold'))
+        self.text_widget.tag_configure('comment_number', foreground='#888888', font=_FONT_UI_BOLD)
+        self.text_widget.tag_configure('comment_text', foreground='#d4d4d4')
+        self.text_widget.tag_configure('comment_date', foreground='#666666', font=_FONT_SMALL)
+        self.text_widget.tag_configure('no_comments', foreground='#888888', font=('Consolas', 10, 'italic'))
+        self.text_widget.tag_configure('instructions', foreground='#888888')
 
     def restore_session(self):
         """Restore the previous session state"""
@@ -393,15 +620,17 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
                     self.path_entry.delete(0, tk.END)
                     self.path_entry.insert(0, self.home_directory)
 
-            # Restore file if available
-            if saved_file and os.path.isfile(saved_file):
+            # Restore file if available (one stat for existence, type and size)
+            try:
+                st = os.stat(saved_file) if saved_file else None
+            except OSError:
+                st = None
+            if st is not None and stat.S_ISREG(st.st_mode):
                 # Check file size before attempting to load (skip files > 10MB)
-                file_size = os.path.getsize(saved_file)
-                if file_size < 10 * 1024 * 1024:  # 10MB limit
-                    # Use root.after to ensure UI is fully initialized
-                    self.root.after(100, lambda: self._restore_file_and_cell(saved_file, saved_cell))
+                if st.st_size < 10 * 1024 * 1024:  # 10MB limit
+                    self._restore_file_and_cell(saved_file, saved_cell)
                 else:
-                    print(f"Skipping large file ({file_size} bytes): {saved_file}")
+                    print(f"Skipping large file ({st.st_size} bytes): {saved_file}")
         except Exception as e:
             print(f"Error restoring session: {e}")
             # Continue with default state
@@ -409,50 +638,104 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
     def _restore_file_and_cell(self, file_path, cell_index):
         """Helper method to restore file and cell position"""
         try:
-            self.display_file(file_path)
-            # Navigate to saved cell if it exists
-            if self.cells and 0 <= cell_index < len(self.cells):
-                self.current_cell = cell_index
-                self.display_current_cell()
+            # display_file navigates to the saved cell once the file is loaded
+            self.display_file(file_path, cell_index)
         except Exception as e:
             print(f"Error restoring session: {e}")
 
-    def populate_favorites(self):
-        """Populate favorites tree with starred items"""
-        self.favorites_tree.delete(*self.favorites_tree.get_children())
+    def populate_favorites(self, rebuild=False):
+        """Populate favorites tree with starred items (rebuild=True relists every row)"""
+        if rebuild:
+            self.favorites_tree.delete(*self.favorites_tree.get_children())
+            self._lazy_nodes[self.favorites_tree].clear()
+            self._more_rows[self.favorites_tree].clear()
+            self._drop_deferred_expansions(self.favorites_tree)
+            self._favorites_items.clear()
 
         # Configure favorites tree with no extra columns (simpler approach)
         self.favorites_tree['columns'] = ()
         self.favorites_tree.column('#0', width=400)
 
-        starred_paths = self.get_starred_items()
+        # Stat the starred paths on a worker; stale or network paths can block for a while
+        self._favorites_seq += 1
+        self._submit_background(self._stat_favorites_worker, self._favorites_seq, self.get_starred_items())
 
+    def _stat_favorites_worker(self, favorites_seq, starred_paths):
+        """Resolve (path, is_dir) for starred paths that still exist, off the Tk thread."""
+        # Favorites sharing a parent are resolved from one scandir of that parent
+        siblings = defaultdict(int)
         for path in starred_paths:
-            if os.path.exists(path):
-                name = os.path.basename(path)
-                is_dir = os.path.isdir(path)
-
-                # Show directory path in a muted way with visual separator
-                dir_path = os.path.dirname(path)
-                # Use subtle separator and lighter color indicator
-                display_text = f'⭐ {name}  ‹ {dir_path}'
-
-                node = self.favorites_tree.insert(
-                    '',
-                    'end',
-                    text=display_text,
-                    values=[path],
-                    open=is_dir and path in self.favorites_open_paths,
-                    tags=('favorite',)
-                )
+            siblings[os.path.dirname(path)] += 1
+        listed = {}
+        for parent, count in siblings.items():
+            if count < 2:
+                continue
+            try:
+                with os.scandir(parent) as it:
+                    for entry in it:
+                        if not entry.is_symlink():
+                            listed[entry.path] = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+
+        results = []
+        for path in starred_paths:
+            is_dir = listed.get(path)
+            if is_dir is None:
+                try:
+                    st = os.stat(path)
+                except (OSError, ValueError):
+                    continue
+                is_dir = stat.S_ISDIR(st.st_mode)
+            results.append((path, is_dir))
+        self._load_results.put((self._apply_favorites, (favorites_seq, results)))
+
+    def _apply_favorites(self, favorites_seq, results):
+        """Apply favorites rows from _stat_favorites_worker (runs on the Tk thread).
+
+        Only added and removed favorites touch the tree; rows that stay keep
+        their node, expansion and loaded children.
+        """
+        if favorites_seq != self._favorites_seq:
+            return
 
-                if is_dir and path in self.favorites_open_paths:
-                    self.populate_favorites_subtree(node, path)
-                elif is_dir:
-                    self.favorites_tree.insert(node, 'end', text='Loading...')
+        tree = self.favorites_tree
+        items = self._favorites_items
+        wanted = dict(results)
+        for path in [p for p, (_, is_dir) in items.items() if wanted.get(p) != is_dir]:
+            node, _ = items.pop(path)
+            self._forget_tree_node(tree, node, path)
+
+        open_paths = self.favorites_open_paths
+        for index, (path, is_dir) in enumerate(results):
+            if path in items:
+                continue
+            dir_path, name = os.path.split(path)
+            is_open = is_dir and path in open_paths
+
+            # Show directory path in a muted way with subtle separator
+            node = tree.insert(
+                '',
+                index,
+                text=f'⭐ {name}  ‹ {dir_path}',
+                values=[path],
+                open=is_open,
+                tags=_FAVORITE_TAGS
+            )
+            items[path] = (node, is_dir)
+
+            if is_dir:
+                # Remembered-open favorites are listed from an idle callback, like the main tree
+                self.add_loading_placeholder(tree, node)
+                if is_open:
+                    self._defer_tree_expansion(tree, node, path, 0)
+
+        # Kept rows are already in starred order; reorder in one call if that ever drifts
+        order = tuple(items[path][0] for path, _ in results)
+        if tree.get_children('') != order:
+            tree.set_children('', *order)
 
         self.restore_navigation_state()
-        self.schedule_navigation_state_save()
 
     def toggle_star(self, event):
         """Toggle star on selected item"""
@@ -462,7 +745,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         if not item:
             return
 
-        values = widget.item(item)['values']
+        values = widget.item(item, 'values')
         if not values:
             return
 
@@ -473,255 +756,276 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         else:
             self.add_star(path)
 
-        # Refresh both trees
-        self.update_tree_item_display(item, path, widget)
+        # Rows for this path are relabelled in place in both trees; star state comes
+        # from the cached set, so neither tree needs a full re-listing
+        self.relabel_starred_path(path)
         self.populate_favorites()
-        if widget == self.tree:
-            self.refresh_tree()
+
+    def relabel_starred_path(self, path):
+        """Update the star prefix on every listed row for path, in both trees"""
+        favorite_rows = {node for node, _ in self._favorites_items.values()}
+        for tree in (self.tree, self.favorites_tree):
+            # Only folders on the way to path can hold its row
+            stack = list(tree.get_children(''))
+            while stack:
+                node = stack.pop()
+                values = tree.item(node, 'values')
+                if not values:
+                    continue  # placeholder or '… more items' row
+                node_path = values[0]
+                if node_path == path:
+                    if node not in favorite_rows:
+                        self.update_tree_item_display(node, path, tree)
+                elif path.startswith(node_path + os.sep):
+                    stack.extend(tree.get_children(node))
 
     def update_tree_item_display(self, item, path, widget):
         """Update tree item to show star status"""
-        current_text = widget.item(item)['text']
-        base_name = current_text.replace('⭐ ', '')
-
-        if self.is_starred(path):
-            widget.item(item, text=f'⭐ {base_name}')
-        else:
-            widget.item(item, text=base_name)
+        current_text = widget.item(item, 'text')
+        base_name = current_text[2:] if current_text.startswith('⭐ ') else current_text
+        widget.item(item, text=f'⭐ {base_name}' if self.is_starred(path) else base_name)
 
     def toggle_settings(self):
         """Toggle settings panel visibility"""
-        if self.settings_expanded:
+        self.settings_expanded = not self.settings_expanded
+        self.settings_button.config(**self._settings_button_styles[self.settings_expanded])
+
+        if not self.settings_expanded:
             # Collapse settings
             self.settings_panel.pack_forget()
-            self.settings_expanded = False
-            self.settings_button.config(
-                bg="#cccccc",
-                fg="#000000",
-                font=('Consolas', 10)
-            )
         else:
-            # Expand settings
-            self.settings_expanded = True
-            self.settings_button.config(
-                bg=self.button_color,
-                fg=self.button_text_color,
-                font=('Consolas', 10, 'bold')
-            )
+            # Expand settings: the panel is built once, then refreshed from the saved values
+            if not self._settings_built:
+                self._build_settings_panel()
+                self._settings_built = True
+            self._load_settings_into_panel()
+            self.settings_panel.pack(side=tk.BOTTOM, fill=tk.X, before=self.settings_button, padx=5, pady=(0, 5))
 
-            # Clear and rebuild settings panel
-            for widget in self.settings_panel.winfo_children():
-                widget.destroy()
+    def _load_settings_into_panel(self):
+        """Reset the settings widgets to the current saved values (drops unsaved edits)"""
+        self.home_entry.delete(0, tk.END)
+        self.home_entry.insert(0, self.home_directory)
+        self.speed_var.set(self.voice_speed)
+        self.speed_label.config(text=f"{self.voice_speed} wpm")
+        self.export_prompt_var.set(getattr(self, 'export_prompt', True))
+        self.api_key_entry.delete(0, tk.END)
+        self.api_key_entry.insert(0, self.openai_api_key)
+
+    def _build_settings_panel(self):
+        """Create the settings panel widgets (called on first expand)"""
+        self.settings_panel.config(bg=self.border_color, padx=10, pady=10)
+
+        # Home Directory setting
+        tk.Label(
+            self.settings_panel,
+            text="Home Directory:",
+            bg=self.border_color,
+            fg=self.fg_color,
+            font=_FONT_UI_BOLD
+        ).pack(pady=(5, 3), anchor='w')
 
-            self.settings_panel.config(bg=self.border_color, padx=10, pady=10)
-            self.settings_panel.pack(side=tk.BOTTOM, fill=tk.X, before=self.settings_button, padx=5, pady=(0, 5))
+        home_frame = tk.Frame(self.settings_panel, bg=self.border_color)
+        home_frame.pack(fill=tk.X, pady=3)
 
-            # Home Directory setting
-            tk.Label(
-                self.settings_panel,
-                text="Home Directory:",
-                bg=self.border_color,
-                fg=self.fg_color,
-                font=('Consolas', 10, 'bold')
-            ).pack(pady=(5, 3), anchor='w')
-
-            home_frame = tk.Frame(self.settings_panel, bg=self.border_color)
-            home_frame.pack(fill=tk.X, pady=3)
-
-            self.home_entry = tk.Entry(
-                home_frame,
-                bg=self.bg_color,
-                fg=self.fg_color,
-                insertbackground=self.fg_color,
-                font=('Consolas', 9),
-                width=25
-            )
-            self.home_entry.insert(0, self.home_directory)
-            self.home_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
-
-            def browse_directory():
-                from tkinter import filedialog
-                directory = filedialog.askdirectory(initialdir=self.home_directory)
-                if directory:
-                    self.home_entry.delete(0, tk.END)
-                    self.home_entry.insert(0, directory)
-
-            tk.Button(
-                home_frame,
-                text="...",
-                bg="#cccccc",
-                fg="#000000",
-                font=('Consolas', 9),
-                relief=tk.RAISED,
-                padx=8,
-                pady=2,
-                command=browse_directory
-            ).pack(side=tk.LEFT)
-
-            # Voice Speed setting
-            tk.Label(
-                self.settings_panel,
-                text="Voice Speed:",
-                bg=self.border_color,
-                fg=self.fg_color,
-                font=('Consolas', 10, 'bold')
-            ).pack(pady=(10, 3), anchor='w')
-
-            speed_frame = tk.Frame(self.settings_panel, bg=self.border_color)
-            speed_frame.pack(fill=tk.X, pady=3)
-
-            self.speed_var = tk.IntVar(value=self.voice_speed)
-            self.speed_label = tk.Label(
-                speed_frame,
-                text=f"{self.voice_speed} wpm",
-                bg=self.border_color,
-                fg=self.fg_color,
-                font=('Consolas', 9),
-                width=8
-            )
-            self.speed_label.pack(side=tk.LEFT, padx=(0, 5))
-
-            def update_speed_label(val):
-                self.speed_label.config(text=f"{int(float(val))} wpm")
-
-            speed_slider = tk.Scale(
-                speed_frame,
-                from_=100,
-                to=400,
-                orient=tk.HORIZONTAL,
-                variable=self.speed_var,
-                bg=self.border_color,
-                fg=self.fg_color,
-                highlightthickness=0,
-                command=update_speed_label,
-                length=130,
-                font=('Consolas', 8)
-            )
-            speed_slider.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        self.home_entry = tk.Entry(
+            home_frame,
+            bg=self.bg_color,
+            fg=self.fg_color,
+            insertbackground=self.fg_color,
+            font=_FONT_SMALL,
+            width=25
+        )
+        self.home_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
 
-            def test_voice():
-                sample_text = "This is a sample of the voice speed you have selected."
-                temp_speed = self.speed_var.get()
-                # Test with the selected speed
-                import subprocess
-                try:
-                    test_process = subprocess.Popen(
-                        ['say', '-r', str(temp_speed), sample_text],
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL
-                    )
-                except Exception as e:
-                    print(f"TTS test error: {e}")
+        def browse_directory():
+            from tkinter import filedialog
+            directory = filedialog.askdirectory(initialdir=self.home_directory)
+            if directory:
+                self.home_entry.delete(0, tk.END)
+                self.home_entry.insert(0, directory)
 
-            tk.Button(
-                speed_frame,
-                text="Test",
-                bg="#cccccc",
-                fg="#000000",
-                font=('Consolas', 9),
-                relief=tk.RAISED,
-                padx=8,
-                pady=2,
-                command=test_voice
-            ).pack(side=tk.LEFT)
-
-            # Export behavior
-            tk.Label(
-                self.settings_panel,
-                text="Export Behavior:",
-                bg=self.border_color,
-                fg=self.fg_color,
-                font=('Consolas', 10, 'bold')
-            ).pack(pady=(10, 3), anchor='w')
-
-            export_frame = tk.Frame(self.settings_panel, bg=self.border_color)
-            export_frame.pack(fill=tk.X, pady=3)
-
-            self.export_prompt_var = tk.BooleanVar(value=getattr(self, 'export_prompt', True))
-            tk.Checkbutton(
-                export_frame,
-                text="Always prompt for save location on Cmd+E",
-                variable=self.export_prompt_var,
-                onvalue=True,
-                offvalue=False,
-                bg=self.border_color,
-                fg=self.fg_color,
-                selectcolor=self.border_color,
-                activebackground=self.border_color,
-                activeforeground=self.fg_color,
-                highlightthickness=0,
-                font=('Consolas', 9)
-            ).pack(anchor='w')
-
-            # OpenAI API Key setting
-            tk.Label(
-                self.settings_panel,
-                text="OpenAI API Key:",
-                bg=self.border_color,
-                fg=self.fg_color,
-                font=('Consolas', 10, 'bold')
-            ).pack(pady=(10, 3), anchor='w')
-
-            api_frame = tk.Frame(self.settings_panel, bg=self.border_color)
-            api_frame.pack(fill=tk.X, pady=3)
-
-            self.api_key_entry = tk.Entry(
-                api_frame,
-                bg=self.bg_color,
-                fg=self.fg_color,
-                insertbackground=self.fg_color,
-                font=('Consolas', 9),
-                show="•",
-                width=35
-            )
-            self.api_key_entry.insert(0, self.openai_api_key)
-            self.api_key_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
-
-            tk.Label(
-                self.settings_panel,
-                text="Used for @chat commands in comments",
-                bg=self.border_color,
-                fg="#888888",
-                font=('Consolas', 8)
-            ).pack(pady=(2, 0), anchor='w')
-
-            def save_settings():
-                new_home = self.home_entry.get()
-                new_speed = self.speed_var.get()
-                new_api_key = self.api_key_entry.get()
-                new_export_prompt = bool(self.export_prompt_var.get())
-
-                if os.path.isdir(new_home):
-                    self.home_directory = new_home
-                    self.current_root = new_home
-                    self.save_setting('home_directory', new_home)
-                    self.path_entry.delete(0, tk.END)
-                    self.path_entry.insert(0, new_home)
-                    self.refresh_tree()
+        tk.Button(
+            home_frame,
+            text="...",
+            bg="#cccccc",
+            fg="#000000",
+            font=_FONT_SMALL,
+            relief=tk.RAISED,
+            padx=8,
+            pady=2,
+            command=browse_directory
+        ).pack(side=tk.LEFT)
+
+        # Voice Speed setting
+        tk.Label(
+            self.settings_panel,
+            text="Voice Speed:",
+            bg=self.border_color,
+            fg=self.fg_color,
+            font=_FONT_UI_BOLD
+        ).pack(pady=(10, 3), anchor='w')
 
-                self.voice_speed = new_speed
-                self.save_setting('voice_speed', new_speed)
+        speed_frame = tk.Frame(self.settings_panel, bg=self.border_color)
+        speed_frame.pack(fill=tk.X, pady=3)
 
-                self.openai_api_key = new_api_key
-                self.save_setting('openai_api_key', new_api_key)
+        self.speed_var = tk.IntVar(value=self.voice_speed)
+        self.speed_label = tk.Label(
+            speed_frame,
+            text=f"{self.voice_speed} wpm",
+            bg=self.border_color,
+            fg=self.fg_color,
+            font=_FONT_SMALL,
+            width=8
+        )
+        self.speed_label.pack(side=tk.LEFT, padx=(0, 5))
 
-                # Save export behavior
-                self.export_prompt = new_export_prompt
-                self.save_setting('export_prompt', '1' if new_export_prompt else '0')
+        def update_speed_label(val):
+            self.speed_label.config(text=f"{int(float(val))} wpm")
 
-                self.toggle_settings()
+        speed_slider = tk.Scale(
+            speed_frame,
+            from_=100,
+            to=400,
+            orient=tk.HORIZONTAL,
+            variable=self.speed_var,
+            bg=self.border_color,
+            fg=self.fg_color,
+            highlightthickness=0,
+            command=update_speed_label,
+            length=130,
+            font=('Consolas', 8)
+        )
+        speed_slider.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
 
-            tk.Button(
-                self.settings_panel,
-                text="Save Settings",
-                bg=self.button_color,
-                fg=self.button_text_color,
-                font=('Consolas', 10, 'bold'),
-                relief=tk.RAISED,
-                padx=15,
-                pady=5,
-                command=save_settings
-            ).pack(pady=(10, 5))
+        def test_voice():
+            sample_text = "This is a sample of the voice speed you have selected."
+            temp_speed = self.speed_var.get()
+            # Test with the selected speed
+            import subprocess
+            try:
+                subprocess.Popen(
+                    ['say', '-r', str(temp_speed), sample_text],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL
+                )
+            except Exception as e:
+                print(f"TTS test error: {e}")
+
+        tk.Button(
+            speed_frame,
+            text="Test",
+            bg="#cccccc",
+            fg="#000000",
+            font=_FONT_SMALL,
+            relief=tk.RAISED,
+            padx=8,
+            pady=2,
+            command=test_voice
+        ).pack(side=tk.LEFT)
+
+        # Export behavior
+        tk.Label(
+            self.settings_panel,
+            text="Export Behavior:",
+            bg=self.border_color,
+            fg=self.fg_color,
+            font=_FONT_UI_BOLD
+        ).pack(pady=(10, 3), anchor='w')
+
+        export_frame = tk.Frame(self.settings_panel, bg=self.border_color)
+        export_frame.pack(fill=tk.X, pady=3)
+
+        self.export_prompt_var = tk.BooleanVar(value=getattr(self, 'export_prompt', True))
+        tk.Checkbutton(
+            export_frame,
+            text="Always prompt for save location on Cmd+E",
+            variable=self.export_prompt_var,
+            onvalue=True,
+            offvalue=False,
+            bg=self.border_color,
+            fg=self.fg_color,
+            selectcolor=self.border_color,
+            activebackground=self.border_color,
+            activeforeground=self.fg_color,
+            highlightthickness=0,
+            font=_FONT_SMALL
+        ).pack(anchor='w')
+
+        # OpenAI API Key setting
+        tk.Label(
+            self.settings_panel,
+            text="OpenAI API Key:",
+            bg=self.border_color,
+            fg=self.fg_color,
+            font=_FONT_UI_BOLD
+        ).pack(pady=(10, 3), anchor='w')
+
+        api_frame = tk.Frame(self.settings_panel, bg=self.border_color)
+        api_frame.pack(fill=tk.X, pady=3)
+
+        self.api_key_entry = tk.Entry(
+            api_frame,
+            bg=self.bg_color,
+            fg=self.fg_color,
+            insertbackground=self.fg_color,
+            font=_FONT_SMALL,
+            show="•",
+            width=35
+        )
+        self.api_key_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        tk.Label(
+            self.settings_panel,
+            text="Used for @chat commands in comments",
+            bg=self.border_color,
+            fg="#888888",
+            font=('Consolas', 8)
+        ).pack(pady=(2, 0), anchor='w')
+
+        def apply_settings():
+            new_home = self.home_entry.get()
+            new_speed = self.speed_var.get()
+            new_api_key = self.api_key_entry.get()
+            new_export_prompt = bool(self.export_prompt_var.get())
+
+            # Only changed values are written, all in one transaction
+            changed = {}
+            if os.path.isdir(new_home):
+                if new_home != self.home_directory:
+                    changed['home_directory'] = new_home
+                self.home_directory = new_home
+                self.current_root = new_home
+                self.path_entry.delete(0, tk.END)
+                self.path_entry.insert(0, new_home)
+                self.refresh_tree()
+
+            if new_speed != self.voice_speed:
+                changed['voice_speed'] = new_speed
+            self.voice_speed = new_speed
+
+            if new_api_key != self.openai_api_key:
+                changed['openai_api_key'] = new_api_key
+            self.openai_api_key = new_api_key
+
+            # Save export behavior
+            if new_export_prompt != self.export_prompt:
+                changed['export_prompt'] = '1' if new_export_prompt else '0'
+            self.export_prompt = new_export_prompt
+
+            self.save_settings(changed)
+            self.toggle_settings()
+
+        tk.Button(
+            self.settings_panel,
+            text="Save Settings",
+            bg=self.button_color,
+            fg=self.button_text_color,
+            font=_FONT_UI_BOLD,
+            relief=tk.RAISED,
+            padx=15,
+            pady=5,
+            command=apply_settings
+        ).pack(pady=(10, 5))
 
     def toggle_markdown_filter(self):
         """Toggle markdown-only filter"""
@@ -732,14 +1036,14 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
                 bg=self.button_color,
                 fg=self.button_text_color,
                 text="Markdown Only ✓",
-                font=('Consolas', 10, 'bold')
+                font=_FONT_UI_BOLD
             )
         else:
             self.md_button.config(
                 bg="#cccccc",
                 fg="#000000",
                 text="Markdown Only",
-                font=('Consolas', 10)
+                font=_FONT_UI
             )
 
         self.refresh_tree()
@@ -751,22 +1055,131 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
 
         if os.path.isdir(path):
             self.current_root = path
-            self.refresh_tree()
+            self.sync_tree()
             self.save_session_state()
         else:
             self.path_label.config(text=f"Error: '{path}' is not a valid directory")
 
     def refresh_tree(self):
         """Clear and repopulate the tree"""
+        self.load_starred_cache()
+        self._drop_deferred_expansions(self.tree)
+        self._lazy_nodes[self.tree].clear()
+        self._more_rows[self.tree].clear()
+        self._dir_stamps.clear()
+        self._tree_root = self.current_root
         self.tree.delete(*self.tree.get_children())
         self.populate_tree(path=self.current_root)
         self.restore_navigation_state()
-        self.schedule_navigation_state_save()
+
+    def sync_tree(self):
+        """Bring the tree up to date, re-listing only folders whose mtime changed"""
+        if self._tree_root != self.current_root:
+            self.refresh_tree()
+            return
+
+        self.load_starred_cache()
+        starred = self._starred_cache
+        lazy = self._lazy_nodes[self.tree]
+        stack = [('', self.current_root, 0)]
+        while stack:
+            node, path, depth = stack.pop()
+            try:
+                stamp = os.stat(path).st_mtime_ns
+            except OSError:
+                stamp = None
+            if stamp is None or stamp != self._dir_stamps.get(path):
+                self._resync_tree_children(node, path, depth)
+
+            for child in self.tree.get_children(node):
+                values = self.tree.item(child, 'values')
+                if not values:
+                    continue  # '… more items' row
+                child_path = values[0]
+                # Star labels can be stale if the star was toggled from the favorites tree
+                name = os.path.basename(child_path)
+                display_name = f'⭐ {name}' if child_path in starred else name
+                if self.tree.item(child, 'text') != display_name:
+                    self.tree.item(child, text=display_name)
+                # Folders still behind a placeholder are listed fresh when opened
+                if child_path in self._dir_stamps and child not in lazy:
+                    stack.append((child, child_path, depth + 1))
+
+    def _resync_tree_children(self, node, path, depth):
+        """Diff one folder's listing against its tree children, touching only the delta"""
+        lazy = self._lazy_nodes[self.tree]
+        more_rows = self._more_rows[self.tree]
+        listing = self.list_directory(path)
+        children = self.tree.get_children(node)
+        self._dir_stamps.pop(path, None)
+
+        # Paged folders are simply listed again from their first page
+        if len(listing) > _TREE_PAGE_SIZE or any(child in more_rows for child in children):
+            for child in children:
+                if child in more_rows:
+                    del more_rows[child]
+                    self.tree.delete(child)
+                else:
+                    self._forget_tree_node(self.tree, child, self.tree.item(child, 'values')[0])
+            self._insert_listing(self.tree, node, listing, depth)
+            self._stamp_listed_dir(path)
+            return
+
+        existing = {}
+        for child in children:
+            child_path = self.tree.item(child, 'values')[0]
+            existing[child_path] = (child, child in lazy or child_path in self._dir_stamps)
+
+        order = []
+        for index, (item, item_path, is_dir) in enumerate(listing):
+            current = existing.pop(item_path, None)
+            if current is not None and current[1] == is_dir:
+                order.append(current[0])
+                continue
+            if current is not None:
+                self._forget_tree_node(self.tree, current[0], item_path)
+            order.append(self._insert_tree_entry(self.tree, node, index, item, item_path, is_dir, depth))
+
+        for child, _ in existing.values():
+            self._forget_tree_node(self.tree, child, self.tree.item(child, 'values')[0])
+        if tuple(order) != self.tree.get_children(node):
+            self.tree.set_children(node, *order)
+        self._stamp_listed_dir(path)
+
+    def _forget_tree_node(self, tree, node, path):
+        """Delete a node from either tree and drop the bookkeeping for everything under it"""
+        lazy = self._lazy_nodes[tree]
+        more_rows = self._more_rows[tree]
+        removed = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            removed.add(current)
+            lazy.discard(current)
+            more_rows.pop(current, None)
+            stack.extend(tree.get_children(current))
+        if self._deferred_tree_expansions:
+            self._deferred_tree_expansions = [
+                entry for entry in self._deferred_tree_expansions
+                if entry[0] is not tree or entry[1] not in removed
+            ]
+        if tree == self.tree:
+            prefix = path + os.sep
+            for listed in [p for p in self._dir_stamps if p == path or p.startswith(prefix)]:
+                del self._dir_stamps[listed]
+        tree.delete(node)
+
+    def _stamp_listed_dir(self, path):
+        """Remember a directory-tree folder's mtime as of its listing"""
+        try:
+            self._dir_stamps[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            pass
 
     def refresh_tree_manual(self, event=None):
         """Manually refresh both trees (triggered by Command+R)"""
-        self.refresh_tree()
-        self.populate_favorites()
+        self.sync_tree()
+        self.populate_favorites(rebuild=True)
 
         # Show brief confirmation in path label
         original_text = self.path_label.cget('text')
@@ -862,50 +1275,135 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         if os.path.islink(path):
             return
 
-        try:
-            items = sorted(os.listdir(path))
-            # Limit items to prevent UI freeze on huge directories
-            if len(items) > 1000:
-                items = items[:1000]
-        except (PermissionError, OSError):
-            return
+        self._insert_listing(self.tree, parent, self.list_directory(path), depth, max_depth)
+        self._stamp_listed_dir(path)
+
+    def _insert_listing(self, tree, parent, listing, depth, max_depth=10):
+        """Insert the first page of a folder listing, plus a row that loads the rest"""
+        end = _TREE_PAGE_SIZE
+        if len(listing) > end:
+            # Pages holding remembered-open or selected entries are listed too; rows
+            # that aren't in the tree would drop out of the next saved navigation state
+            if tree == self.tree:
+                open_paths, selected = self.tree_open_paths, self.tree_selected_path
+            else:
+                open_paths, selected = self.favorites_open_paths, self.favorites_selected_path
+            for index in range(len(listing) - 1, end - 1, -1):
+                item_path = listing[index][1]
+                if item_path in open_paths or (selected and (selected == item_path or selected.startswith(item_path + os.sep))):
+                    end = (index // _TREE_PAGE_SIZE + 1) * _TREE_PAGE_SIZE
+                    break
 
-        for item in items:
-            if item.startswith('.'):
-                continue
+        for item, item_path, is_dir in listing[:end]:
+            self._insert_tree_entry(tree, parent, 'end', item, item_path, is_dir, depth, max_depth)
+
+        rest = listing[end:]
+        if rest:
+            more = tree.insert(parent, 'end', text=f'… {len(rest)} more items (click to load)')
+            self._more_rows[tree][more] = (rest, depth, max_depth)
+
+    def _load_more_rows(self, tree, more):
+        """Replace a '… more items' row with the next page of its folder"""
+        rest, depth, max_depth = self._more_rows[tree].pop(more)
+        parent = tree.parent(more)
+        tree.delete(more)
+        first = len(tree.get_children(parent))
+        self._insert_listing(tree, parent, rest, depth, max_depth)
+        # Keep keyboard navigation where the clicked row was
+        tree.focus(tree.get_children(parent)[first])
+
+    def _insert_tree_entry(self, tree, parent, index, item, item_path, is_dir, depth, max_depth=10):
+        """Insert one listed entry into either tree and return its node"""
+        display_name = f'⭐ {item}' if item_path in self._starred_cache else item
+        open_paths = self.tree_open_paths if tree == self.tree else self.favorites_open_paths
+        # Remembered-open folders are inserted already open, saving a second Tcl call
+        is_open = is_dir and item_path in open_paths and depth + 1 < max_depth
+        node = tree.insert(
+            parent,
+            index,
+            text=display_name,
+            values=[item_path],
+            open=is_open
+        )
 
-            item_path = os.path.join(path, item)
+        if is_dir:
+            self.add_loading_placeholder(tree, node)
+            # Their contents are filled in from an idle callback
+            # so this pass only touches one directory level
+            if is_open:
+                self._defer_tree_expansion(tree, node, item_path, depth + 1)
+        return node
 
+    def list_directory(self, path):
+        """Return visible (name, path, is_dir) entries of a folder, sorted by name"""
+        try:
+            # scandir yields cached d_type, so no extra stat() per entry
+            with os.scandir(path) as it:
+                entries = sorted(it, key=attrgetter('name'))
+        except OSError:
+            return []
+
+        markdown_only = self.markdown_only.get()
+        listing = []
+        for entry in entries:
+            name = entry.name
+            if name.startswith('.'):
+                continue
             try:
                 # Skip symlinks
-                if os.path.islink(item_path):
+                if entry.is_symlink():
                     continue
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if markdown_only and not is_dir and not name.endswith('.md'):
+                continue
 
-                is_dir = os.path.isdir(item_path)
-                is_markdown = item.endswith('.md')
+            listing.append((name, entry.path, is_dir))
+        return listing
 
-                if self.markdown_only.get():
-                    if not is_dir and not is_markdown:
-                        continue
+    def _defer_tree_expansion(self, tree, node, path, depth):
+        """Queue a remembered-open folder to be listed from an idle callback"""
+        self._deferred_tree_expansions.append((tree, node, path, depth))
+        if self._deferred_expansion_job is None:
+            self._deferred_expansion_job = self.root.after_idle(self._expand_deferred_tree_nodes)
 
-                display_name = f'⭐ {item}' if self.is_starred(item_path) else item
-                node = self.tree.insert(
-                    parent,
-                    'end',
-                    text=display_name,
-                    values=[item_path],
-                    open=False
-                )
+    def _drop_deferred_expansions(self, tree):
+        """Forget queued expansions for a tree that is about to be rebuilt"""
+        self._deferred_tree_expansions = [
+            entry for entry in self._deferred_tree_expansions if entry[0] is not tree
+        ]
 
-                if is_dir:
-                    if item_path in self.tree_open_paths:
-                        self.tree.item(node, open=True)
-                        self.populate_tree(node, item_path, depth=depth+1, max_depth=max_depth)
-                    else:
-                        self.tree.insert(node, 'end', text='Loading...')
+    def _expand_deferred_tree_nodes(self):
+        """Populate remembered-open folders queued by either tree, a few per idle pass."""
+        self._deferred_expansion_job = None
+        pending = self._deferred_tree_expansions[:_EXPANSIONS_PER_PASS]
+        self._deferred_tree_expansions = self._deferred_tree_expansions[_EXPANSIONS_PER_PASS:]
 
-            except (PermissionError, OSError):
+        for tree, node, path, depth in pending:
+            if not tree.exists(node):
                 continue
+            self._lazy_nodes[tree].discard(node)
+            tree.delete(*tree.get_children(node))
+            if tree == self.tree:
+                self.populate_tree(node, path, depth=depth)
+            else:
+                self.populate_favorites_subtree(node, path, depth=depth)
+
+        # Leftovers (and anything just queued) go to the next pass; once the
+        # last level is in place, selection can be restored
+        if self._deferred_tree_expansions:
+            if self._deferred_expansion_job is None:
+                self._deferred_expansion_job = self.root.after_idle(self._expand_deferred_tree_nodes)
+        else:
+            self.restore_navigation_state()
+
+    def _navigation_state_save_job(self):
+        """Save tree state, but not while remembered-open folders are still being listed"""
+        if self._deferred_tree_expansions:
+            self.tree_state_save_job = self.root.after(500, self._navigation_state_save_job)
+            return
+        super()._navigation_state_save_job()
 
     def on_folder_open(self, event):
         """Handle folder expansion"""
@@ -913,9 +1411,10 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         node = widget.focus()
         children = widget.get_children(node)
 
-        if len(children) == 1 and widget.item(children[0])['text'] == 'Loading...':
-            widget.delete(children[0])
-            path = widget.item(node)['values'][0]
+        if node in self._lazy_nodes[widget]:
+            self._lazy_nodes[widget].discard(node)
+            widget.delete(*children)
+            path = widget.item(node, 'values')[0]
             if widget == self.tree:
                 self.populate_tree(node, path)
             else:
@@ -923,6 +1422,11 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
 
         self.schedule_navigation_state_save()
 
+    def add_loading_placeholder(self, tree, node):
+        """Give a folder a 'Loading...' child and mark it for listing on first open"""
+        tree.insert(node, 'end', text='Loading...')
+        self._lazy_nodes[tree].add(node)
+
     def on_folder_close(self, event):
         """Handle folder collapse events"""
         self.schedule_navigation_state_save()
@@ -937,50 +1441,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         if os.path.islink(path):
             return
 
-        try:
-            items = sorted(os.listdir(path))
-            # Limit items to prevent UI freeze
-            if len(items) > 1000:
-                items = items[:1000]
-        except (PermissionError, OSError):
-            return
-
-        for item in items:
-            if item.startswith('.'):
-                continue
-
-            item_path = os.path.join(path, item)
-
-            try:
-                # Skip symlinks
-                if os.path.islink(item_path):
-                    continue
-
-                is_dir = os.path.isdir(item_path)
-                is_markdown = item.endswith('.md')
-
-                if self.markdown_only.get():
-                    if not is_dir and not is_markdown:
-                        continue
-
-                display_name = f'⭐ {item}' if self.is_starred(item_path) else item
-                node = self.favorites_tree.insert(
-                    parent,
-                    'end',
-                    text=display_name,
-                    values=[item_path],
-                    open=False
-                )
-
-                if is_dir:
-                    if item_path in self.favorites_open_paths:
-                        self.favorites_tree.item(node, open=True)
-                        self.populate_favorites_subtree(node, item_path, depth=depth+1, max_depth=max_depth)
-                    else:
-                        self.favorites_tree.insert(node, 'end', text='Loading...')
-
-            except (PermissionError, OSError):
-                continue
+        self._insert_listing(self.favorites_tree, parent, self.list_directory(path), depth, max_depth)
 
     def on_file_select(self, event):
         """Handle file selection"""
@@ -990,7 +1451,11 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             return
 
         item = selected[0]
-        values = widget.item(item)['values']
+        if item in self._more_rows[widget]:
+            self._load_more_rows(widget, item)
+            return
+
+        values = widget.item(item, 'values')
 
         if not values:
             return
@@ -1002,87 +1467,6 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
 
         self.schedule_navigation_state_save()
 
-    def get_cell_hash(self, content):
-        """Generate hash for cell content"""
-        import hashlib
-        return hashlib.md5(content.encode('utf-8')).hexdigest()
-
-    def extract_heading(self, cell_content):
-        """Extract heading text from cell content"""
-        lines = cell_content.strip().split('\n')
-        for line in lines:
-            if line.startswith('#'):
-                return line.strip()
-        return "[No Heading]"
-
-    def get_comments(self, file_path, cell_content, cell_index):
-        """Get comments for a specific cell with fuzzy matching"""
-        heading = self.extract_heading(cell_content)
-        content_hash = self.get_cell_hash(cell_content)
-
-        # Try exact match first
-        self.cursor.execute(
-            '''SELECT id, comment_text, created_at, match_confidence 
-               FROM comments 
-               WHERE file_path = ? AND heading_text = ? AND content_hash = ?
-               ORDER BY created_at''',
-            (file_path, heading, content_hash)
-        )
-        exact_matches = self.cursor.fetchall()
-
-        if exact_matches:
-            # Update last_matched_at
-            for comment_id, *_ in exact_matches:
-                self.cursor.execute(
-                    'UPDATE comments SET last_matched_at = CURRENT_TIMESTAMP, match_confidence = ? WHERE id = ?',
-                    ('exact', comment_id)
-                )
-            self.conn.commit()
-            return [(text, created, conf) for _, text, created, conf in exact_matches]
-
-        # Try heading match only
-        self.cursor.execute(
-            '''SELECT id, comment_text, created_at, match_confidence 
-               FROM comments 
-               WHERE file_path = ? AND heading_text = ?
-               ORDER BY created_at''',
-            (file_path, heading)
-        )
-        heading_matches = self.cursor.fetchall()
-
-        if heading_matches:
-            # Update with fuzzy confidence
-            for comment_id, *_ in heading_matches:
-                self.cursor.execute(
-                    'UPDATE comments SET last_matched_at = CURRENT_TIMESTAMP, match_confidence = ? WHERE id = ?',
-                    ('fuzzy', comment_id)
-                )
-            self.conn.commit()
-            return [(text, created, 'fuzzy') for _, text, created, _ in heading_matches]
-
-        return []
-
-    def add_comment(self, file_path, cell_content, cell_index, comment_text):
-        """Add a comment to a cell"""
-        heading = self.extract_heading(cell_content)
-        content_hash = self.get_cell_hash(cell_content)
-
-        print(f"DEBUG add_comment: file={file_path}, heading={heading}, hash={content_hash[:8]}, index={cell_index}")
-
-        try:
-            self.cursor.execute(
-                '''INSERT INTO comments
-                   (file_path, heading_text, content_hash, cell_index, comment_text, match_confidence)
-                   VALUES (?, ?, ?, ?, ?, ?)''',
-                (file_path, heading, content_hash, cell_index, comment_text, 'exact')
-            )
-            self.conn.commit()
-            print("DEBUG: Comment inserted successfully")
-            return True
-        except Exception as e:
-            print(f"DEBUG: Error inserting comment: {e}")
-            return False
-
     def stop_reading(self):
         """Stop text-to-speech"""
         if self.tts_process:
@@ -1093,59 +1477,15 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
 
     def clean_text_for_reading(self, text):
         """Clean markdown text for TTS reading"""
-        import re
-
-        # Remove code blocks entirely
-        text = re.sub(r'```[\s\S]*?```', '', text)
-
-        # Remove inline code
-        text = re.sub(r'`[^`]+`', '', text)
-
-        # Remove heading markers but keep the text
-        text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
-
-        # Remove bold/italic markers
-        text = re.sub(r'\*\*\*(.+?)\*\*\*', r'\1', text)  # Bold+italic
-        text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)  # Bold
-        text = re.sub(r'\*(.+?)\*', r'\1', text)  # Italic
-        text = re.sub(r'__(.+?)__', r'\1', text)  # Bold (underscore)
-        text = re.sub(r'_(.+?)_', r'\1', text)  # Italic (underscore)
-
-        # Remove links but keep text
-        text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-
-        # Remove images
-        text = re.sub(r'!\[([^\]]*)\]\([^\)]+\)', '', text)
-
-        # Remove horizontal rules
-        text = re.sub(r'^[-*_]{3,}$', '', text, flags=re.MULTILINE)
-
-        # Remove blockquote markers
-        text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
-
-        # Remove list markers but keep content
-        text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
-
-        # Remove HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
-
-        # Remove strikethrough
-        text = re.sub(r'~~(.+?)~~', r'\1', text)
-
-        # Clean up excessive whitespace but preserve paragraph breaks
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        text = re.sub(r'[ \t]+', ' ', text)
+        for pattern, replacement in _TTS_CLEANUP:
+            text = pattern.sub(replacement, text)
 
         # Remove empty lines at start/end
-        text = text.strip()
-
-        return text
+        return text.strip()
 
     def start_reading(self, text=None):
         """Start reading the current cell aloud"""
         import subprocess
-        import re
 
         if self.reading_mode and text is None:
             self.stop_reading()
@@ -1167,6 +1507,10 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
 
         print(f"DEBUG: Reading with voice_speed={self.voice_speed} wpm, heading_pause={heading_pause_ms}ms, paragraph_pause={paragraph_pause_ms}ms")
 
+        # Pause markers are the same for every line, so build them once
+        heading_suffix = f' [[slnc {heading_pause_ms}]]'
+        paragraph_sep = f' [[slnc {paragraph_pause_ms}]] '
+
         # Process the text differently to preserve heading structure
         lines = cell_content.split('\n')
         processed_parts = []
@@ -1179,9 +1523,12 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             # Check if line is a heading
             if line.startswith('#'):
                 # Extract heading text without markdown
-                heading_text = re.sub(r'^#{1,6}\s+', '', line)
+                heading_text = _HEADING_MARK_RE.sub('', line)
                 # Add heading with pause after
-                processed_parts.append(heading_text + f' [[slnc {heading_pause_ms}]]')
+                processed_parts.append(heading_text + heading_suffix)
+            elif not _TTS_MARKUP_RE.search(line):
+                # Plain prose: nothing in the cleanup pipeline would change it
+                processed_parts.append(line)
             else:
                 # Regular text - clean markdown
                 cleaned = self.clean_text_for_reading(line)
@@ -1189,37 +1536,47 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
                     processed_parts.append(cleaned)
 
         # Join parts with paragraph pauses
-        text_with_pauses = f' [[slnc {paragraph_pause_ms}]] '.join(processed_parts)
+        text_with_pauses = paragraph_sep.join(processed_parts)
 
         # Use macOS 'say' command with voice speed
         try:
             self.reading_mode = True
-            cmd = ['say', '-r', str(self.voice_speed), text_with_pauses]
-            print(f"DEBUG: Running command: say -r {self.voice_speed} [text with {len(text_with_pauses)} chars]")
+            # Text goes in on stdin ('-f -'), so cell size isn't bounded by ARG_MAX
+            cmd = ['say', '-r', str(self.voice_speed), '-f', '-']
+            print(f"DEBUG: Running command: say -r {self.voice_speed} -f - [text with {len(text_with_pauses)} chars]")
             self.tts_process = subprocess.Popen(
                 cmd,
+                stdin=subprocess.PIPE,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL
             )
             if hasattr(self, 'cells') and self.cells:
                 self.display_current_cell()  # Refresh to show reading indicator
 
-            # Monitor when reading finishes
-            self.root.after(100, self.check_reading_status)
+            # Block a daemon thread on the process instead of polling it from Tk
+            self._start_background_thread(
+                self._tts_wait, self.tts_process, text_with_pauses.encode('utf-8'),
+                on_error=partial(self._on_tts_finished, self.tts_process)
+            )
         except Exception as e:
             print(f"TTS error: {e}")
             self.reading_mode = False
 
-    def check_reading_status(self):
-        """Check if TTS is still running"""
-        if self.tts_process and self.tts_process.poll() is None:
-            # Still reading, check again
-            self.root.after(100, self.check_reading_status)
-        else:
-            # Finished reading
-            self.reading_mode = False
-            self.tts_process = None
-            self.display_current_cell()
+    def _tts_wait(self, proc, text):
+        """Feed a TTS process its text and wait for it on a daemon thread, then hand off to the Tk thread"""
+        # communicate() writes stdin, closes it and waits; a stop_reading terminate ends it early
+        proc.communicate(text)
+        self._load_results.put((self._on_tts_finished, (proc,)))
+
+    def _on_tts_finished(self, proc, error=None):
+        """Leave reading mode unless this process was already stopped or replaced"""
+        if error is not None:
+            print(f"TTS error: {error}")
+        if proc is not self.tts_process:
+            return
+        self.reading_mode = False
+        self.tts_process = None
+        self.display_current_cell()
 
     def toggle_focus(self, event):
         """Toggle focus between left panel and reader"""
@@ -1290,45 +1647,31 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             # Auto-save next to current file
             save_path = os.path.join(file_dir, annotated_filename)
 
-        # Build annotated content
-        annotated_lines = []
-
-        for i, cell_content in enumerate(self.cells):
-            # Add the cell content
-            annotated_lines.append(cell_content)
-
-            # Get comments for this cell
-            comments = self.get_comments(self.current_file, cell_content, i)
-
-            if comments:
-                # Add comments as blockquotes
-                annotated_lines.append("\n")
-                annotated_lines.append("---")
-                annotated_lines.append("\n**💬 Comments:**\n")
-                for comment_text, created_at, confidence in comments:
-                    confidence_marker = " ⚠️ (may be outdated)" if confidence == 'fuzzy' else ""
-                    annotated_lines.append(f"\n> **Comment** ({created_at}){confidence_marker}:")
-                    annotated_lines.append(f"> {comment_text}")
-                annotated_lines.append("\n---\n")
-
-        # Write to file
+        # Write to file, one annotated line at a time rather than as one joined string
         try:
-            with open(save_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(annotated_lines))
+            # Match comments before opening the target, so a failed query can't leave it truncated
+            all_comments = self.get_comments_for_cells(self.current_file, self.cells)
+            with open(save_path, 'w', encoding='utf-8', buffering=65536) as f:
+                lines = self._annotated_lines(all_comments)
+                f.write(next(lines))
+                for line in lines:
+                    f.write('\n')
+                    f.write(line)
 
             # Update status in path label
             self.path_label.config(text=f"✓ Saved: {save_path}")
             print(f"Saved annotated file: {save_path}")
 
-            # Refresh the directory in the tree that contains this file
-            file_dir = os.path.dirname(self.current_file)
+            # Refresh the directory in the tree that contains the saved file
+            save_dir = os.path.dirname(os.path.abspath(save_path))
 
             # If we're currently viewing this directory, refresh it
-            if file_dir == self.current_root or self.current_root in file_dir:
-                self.refresh_tree()
+            if save_dir == self.current_root or save_dir.startswith(self.current_root + os.sep):
+                self.sync_tree()
 
-            # Also refresh favorites in case this directory is starred
-            self.populate_favorites()
+            # Favorites only change if the file landed inside a starred folder
+            if any(save_dir == path or save_dir.startswith(path + os.sep) for path in self._starred_cache):
+                self.populate_favorites(rebuild=True)
 
             # Show a temporary notification
             def reset_label():
@@ -1342,17 +1685,34 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
 
         return 'break'
 
+    def _annotated_lines(self, all_comments):
+        """Yield the lines of the annotated export: each cell followed by its comments (one list per cell)"""
+        for cell_content, comments in zip(self.cells, all_comments):
+            # Add the cell content
+            yield cell_content
+
+            if comments:
+                # Add comments as blockquotes, the whole block as one string
+                yield _COMMENT_EXPORT_HEADER + '\n'.join(
+                    _COMMENT_EXPORT_TPL.format(
+                        created_at=created_at,
+                        marker=" ⚠️ (may be outdated)" if confidence == 'fuzzy' else "",
+                        text=comment_text
+                    )
+                    for comment_text, created_at, confidence in comments
+                ) + _COMMENT_EXPORT_FOOTER
+
     def on_arrow_key(self, event):
         """Handle arrow key navigation"""
+        # Only handle arrow keys for markdown cell navigation (checked first: no Tk round trip)
+        if not self.cells or not self.current_file or not self.current_file.endswith('.md'):
+            return
+
         # Check if focus is on the tree views - let them handle arrow keys natively
         focused_widget = self.root.focus_get()
         if focused_widget in (self.tree, self.favorites_tree):
             return  # Let the tree handle the arrow key
 
-        # Only handle arrow keys for markdown cell navigation
-        if not self.cells or not self.current_file or not self.current_file.endswith('.md'):
-            return
-
         if self.viewing_comments:
             if event.keysym == 'Left':
                 self.viewing_comments = False
@@ -1368,11 +1728,13 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
                     self.start_reading()
                 return 'break'
             elif event.keysym == 'Down':
-                self.stop_reading()  # Stop if navigating away
+                if self.reading_mode:
+                    self.stop_reading()  # Stop if navigating away
                 self.navigate_to_cell(self.current_cell + 1)
                 return 'break'
             elif event.keysym == 'Up':
-                self.stop_reading()  # Stop if navigating away
+                if self.reading_mode:
+                    self.stop_reading()  # Stop if navigating away
                 self.navigate_to_cell(self.current_cell - 1)
                 return 'break'
             elif event.keysym == 'Right':
@@ -1396,7 +1758,16 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         self.current_comment_reading_index = -1
 
         self.current_cell = cell_index
-        self.display_current_cell()
+
+        # Held arrow keys fire faster than a cell renders; draw at most once per frame
+        if self._pending_render is None:
+            self._pending_render = self.root.after(16, self._render_pending_cell)
+
+    def _render_pending_cell(self):
+        """Render the cell chosen by the latest burst of navigation keys"""
+        self._pending_render = None
+        if not self.viewing_comments:
+            self.display_current_cell()
         self.save_session_state()
 
     def display_current_cell(self):
@@ -1409,24 +1780,29 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         total_cells = len(self.cells)
         reading_status = " 🔊 READING..." if self.reading_mode else ""
         indicator = f"Cell {self.current_cell + 1} / {total_cells}{reading_status}   [← Read/Stop] [→ Comments] [↑↓ Navigate]\n"
-        self.text_widget.insert('1.0', indicator, 'cell_indicator')
-        self.text_widget.insert(tk.END, '─' * 80 + '\n\n', 'separator')
 
         cell_content = self.cells[self.current_cell]
-        self.render_markdown_cell(cell_content)
 
-        comments = self.get_comments(self.current_file, cell_content, self.current_cell)
-        if comments:
-            fuzzy_count = sum(1 for _, _, conf in comments if conf == 'fuzzy')
+        comment_count, fuzzy_count = self.count_comments(self.current_file, cell_content)
+        if comment_count:
             if fuzzy_count > 0:
-                self.text_widget.insert(tk.END, f'\n\n💬 {len(comments)} comment(s) (⚠️ {fuzzy_count} may be outdated) - Press → to view', 'comment_hint')
+                hint = f'\n\n💬 {comment_count} comment(s) (⚠️ {fuzzy_count} may be outdated) - Press → to view'
             else:
-                self.text_widget.insert(tk.END, f'\n\n💬 {len(comments)} comment(s) - Press → to view', 'comment_hint')
+                hint = f'\n\n💬 {comment_count} comment(s) - Press → to view'
         else:
-            self.text_widget.insert(tk.END, '\n\n💬 No comments yet - Press → to add or review', 'comment_hint')
+            hint = '\n\n💬 No comments yet - Press → to add or review'
+
+        # Indicator, cell body, hint and the gap before the copy button go in as one insert
+        self.text_widget.insert(
+            tk.END,
+            indicator, 'cell_indicator',
+            '─' * 80 + '\n\n', 'separator',
+            *self.cell_insert_args(cell_content),
+            hint, 'comment_hint',
+            '\n\n', ()
+        )
 
         # Copy cell button
-        self.text_widget.insert(tk.END, '\n\n')
         copy_frame = tk.Frame(self.text_widget, bg=self.bg_color)
         self.text_widget.window_create(tk.END, window=copy_frame)
 
@@ -1447,23 +1823,19 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         """Display comments for current cell"""
         self.text_widget.delete('1.0', tk.END)
 
-        self.text_widget.insert('1.0', f"💬 Comments for Cell {self.current_cell + 1}   [← Back]\n", 'comment_header')
-        self.text_widget.insert(tk.END, '─' * 80 + '\n\n', 'separator')
-
-        cell_content = self.cells[self.current_cell]
-        comments = self.get_comments(self.current_file, cell_content, self.current_cell)
-
-        if comments:
-            for i, (comment_text, created_at, confidence) in enumerate(comments, 1):
-                prefix = "⚠️ " if confidence == 'fuzzy' else ""
-                self.text_widget.insert(tk.END, f"{prefix}Comment {i}:\n", 'comment_number')
-                self.text_widget.insert(tk.END, f"{comment_text}\n", 'comment_text')
-                confidence_text = " (Content may have changed)" if confidence == 'fuzzy' else ""
-                self.text_widget.insert(tk.END, f"Posted: {created_at}{confidence_text}\n\n", 'comment_date')
-        else:
-            self.text_widget.insert(tk.END, "No comments yet.\n\n", 'no_comments')
+        self.text_widget.insert(
+            tk.END,
+            f"💬 Comments for Cell {self.current_cell + 1}   [← Back]\n", 'comment_header',
+            '─' * 80 + '\n\n', 'separator'
+        )
 
-        self.text_widget.insert(tk.END, "\n" + "─" * 80 + "\n", 'separator')
+        # The list sits between two marks so refresh_comment_list can redo just that part;
+        # left gravity keeps them in place while the rest of the view is appended
+        self.text_widget.mark_set('comment_list', 'end-1c')
+        self.text_widget.mark_gravity('comment_list', tk.LEFT)
+        self.text_widget.insert(tk.END, *self.comment_list_args())
+        self.text_widget.mark_set('comment_list_end', 'end-1c')
+        self.text_widget.mark_gravity('comment_list_end', tk.LEFT)
 
         # Narrate toggle button
         narrate_frame = tk.Frame(self.text_widget, bg=self.bg_color)
@@ -1496,43 +1868,63 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         )
         status_label.pack(side=tk.LEFT, padx=(5, 0))
 
-        self.text_widget.insert(tk.END, "\n")
-        self.text_widget.insert(tk.END, "Type a comment or '@chat <question>' to ask AI (Cmd+Enter to save):\n", 'instructions')
+        self.text_widget.insert(
+            tk.END,
+            "\n", (),
+            "Type a comment or '@chat <question>' to ask AI (Cmd+Enter to save):\n", 'instructions'
+        )
 
         self.comment_input = tk.Text(
             self.text_widget,
             height=4,
             bg=self.border_color,
             fg=self.fg_color,
-            font=('Consolas', 10),
+            font=_FONT_UI,
             wrap=tk.WORD
         )
         self.text_widget.window_create(tk.END, window=self.comment_input)
         self.comment_input.bind('<Command-Return>', self.save_comment)
         self.comment_input.focus_set()
 
-    def call_openai(self, prompt, cell_context, file_content, previous_comments):
-        """Call OpenAI API with the prompt, cell context, file content, and previous comments"""
+    def comment_list_args(self):
+        """Return Text.insert arguments for the current cell's comments, collected for a single insert"""
+        cell_content = self.cells[self.current_cell]
+        comments = self.get_comments(self.current_file, cell_content, self.current_cell)
+
+        args = []
+        if comments:
+            for i, (comment_text, created_at, confidence) in enumerate(comments, 1):
+                prefix = "⚠️ " if confidence == 'fuzzy' else ""
+                confidence_text = " (Content may have changed)" if confidence == 'fuzzy' else ""
+                args += (
+                    f"{prefix}Comment {i}:\n", 'comment_number',
+                    f"{comment_text}\n", 'comment_text',
+                    f"Posted: {created_at}{confidence_text}\n\n", 'comment_date',
+                )
+        else:
+            args += ("No comments yet.\n\n", 'no_comments')
+
+        args += ("\n" + "─" * 80 + "\n", 'separator')
+        return args
+
+    def refresh_comment_list(self):
+        """Re-list the current cell's comments, leaving the input box and anything typed in it alone"""
+        text = self.text_widget
+        text.delete('comment_list', 'comment_list_end')
+        # The end mark rides along with the new text, then stays put again
+        text.mark_gravity('comment_list_end', tk.RIGHT)
+        text.insert('comment_list', *self.comment_list_args())
+        text.mark_gravity('comment_list_end', tk.LEFT)
+
+    def call_openai(self, prompt, cell_context, file_content, previous_comments, excerpt=False):
+        """Call OpenAI API with the prompt, cell context, file content (or an excerpt), and previous comments"""
         if not self.openai_api_key:
             return "Error: OpenAI API key not configured. Please add it in Settings."
 
         try:
             import json
-            import urllib.request
-            import urllib.error
-            import ssl
-
-            # Create SSL context with certifi bundle (fixes certificate verification issues on macOS)
-            try:
-                import certifi
-                ssl_context = ssl.create_default_context(cafile=certifi.where())
-            except ImportError:
-                # Fallback: disable SSL verification if certifi not available (not ideal but works)
-                ssl_context = ssl._create_unverified_context()
-                print("Warning: SSL verification disabled. Install certifi for secure connections.")
 
             # Prepare the request
-            url = "https://api.openai.com/v1/chat/completions"
             headers = {
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {self.openai_api_key}"
@@ -1541,12 +1933,14 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             # Build context with previous comments
             comments_context = ""
             if previous_comments:
-                comments_context = "\n\n## Previous Comments on This Cell:\n"
-                for i, (comment_text, created_at, confidence) in enumerate(previous_comments, 1):
-                    comments_context += f"\n{i}. {comment_text}\n"
+                comments_context = "\n\n## Previous Comments on This Cell:\n" + ''.join(
+                    f"\n{i}. {comment_text}\n"
+                    for i, (comment_text, created_at, confidence) in enumerate(previous_comments, 1)
+                )
 
             # Build full context
-            full_context = f"""## Full File Content:
+            file_heading = "File Excerpt (cells around the current one)" if excerpt else "Full File Content"
+            full_context = f"""## {file_heading}:
 {file_content}
 
 ## Current Cell Being Discussed:
@@ -1574,25 +1968,129 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             }
 
             # Make the request
-            req = urllib.request.Request(
-                url,
-                data=json.dumps(payload).encode('utf-8'),
-                headers=headers,
-                method='POST'
-            )
+            status, body = self._openai_post('/v1/chat/completions', json.dumps(payload).encode('utf-8'), headers)
+            if status >= 400:
+                print(f"OpenAI API Error: {status} - {body.decode('utf-8')}")
+                return f"Error: OpenAI API request failed ({status}). Check your API key."
 
-            with urllib.request.urlopen(req, context=ssl_context, timeout=30) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                return result['choices'][0]['message']['content'].strip()
+            result = json.loads(body.decode('utf-8'))
+            return result['choices'][0]['message']['content'].strip()
 
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode('utf-8')
-            print(f"OpenAI API Error: {e.code} - {error_body}")
-            return f"Error: OpenAI API request failed ({e.code}). Check your API key."
         except Exception as e:
             print(f"OpenAI Error: {e}")
             return f"Error: {str(e)}"
 
+    def _openai_post(self, path, body, headers):
+        """POST to api.openai.com over a kept-alive connection; returns (status, body bytes)"""
+        import http.client
+        import ssl
+
+        with self._openai_lock:
+            # Reusing one connection skips the TCP + TLS handshake on later @chat requests
+            for attempt in range(2):
+                if self._openai_conn is None:
+                    # Create SSL context with certifi bundle (fixes certificate verification issues on macOS)
+                    try:
+                        import certifi
+                        ssl_context = ssl.create_default_context(cafile=certifi.where())
+                    except ImportError:
+                        # Fallback: disable SSL verification if certifi not available (not ideal but works)
+                        ssl_context = ssl._create_unverified_context()
+                        print("Warning: SSL verification disabled. Install certifi for secure connections.")
+                    self._openai_conn = http.client.HTTPSConnection('api.openai.com', context=ssl_context, timeout=30)
+                try:
+                    self._openai_conn.request('POST', path, body=body, headers=headers)
+                    response = self._openai_conn.getresponse()
+                    return response.status, response.read()
+                except (http.client.HTTPException, ConnectionError):
+                    # The server may have dropped the idle connection; retry once on a fresh one
+                    self._openai_conn.close()
+                    self._openai_conn = None
+                    if attempt:
+                        raise
+                except Exception:
+                    self._openai_conn.close()
+                    self._openai_conn = None
+                    raise
+
+    def _chat_excerpt(self, cell_index):
+        """Return the cells around cell_index for the AI context, or None if the whole file is small enough"""
+        cells = self.cells
+        if sum(map(len, cells)) <= _CHAT_CONTEXT_CHARS:
+            return None
+
+        # Grow outwards from the current cell, alternating sides, while the cells fit;
+        # only the outermost neighbour taken is cut short
+        current = cells[cell_index]
+        if len(current) > _CHAT_CONTEXT_CHARS:
+            current = current[:_CHAT_CONTEXT_CHARS] + '\n[...]'
+        before, after = [], []
+        lo, hi = cell_index, cell_index + 1
+        room = _CHAT_CONTEXT_CHARS - len(current)
+        for step in range(1, _CHAT_CONTEXT_CELLS + 1):
+            for index in (cell_index - step, cell_index + step):
+                if room <= 0 or not 0 <= index < len(cells):
+                    continue
+                cell = cells[index]
+                room -= len(cell) + 2  # plus the blank line joining it on
+                if room < 0:
+                    keep = len(cell) + room
+                    if keep <= 0:
+                        continue
+                    # Keep the end nearest the current cell
+                    cell = '[...]\n' + cell[-keep:] if index < cell_index else cell[:keep] + '\n[...]'
+                if index < cell_index:
+                    before.append(cell)
+                    lo = index
+                else:
+                    after.append(cell)
+                    hi = index + 1
+
+        excerpt = f"[Cells {lo + 1}-{hi} of {len(cells)}; the current cell is {cell_index + 1}]\n\n"
+        return excerpt + '\n\n'.join(before[::-1] + [current] + after)
+
+    def _ai_comment_worker(self, file_path, cell_index, cell_content, question, previous_comments,
+                           file_content, excerpt):
+        """Call OpenAI off the Tk thread, then hand the answer back"""
+        ai_response = self.call_openai(question, cell_content, file_content, previous_comments, excerpt=excerpt)
+        self._load_results.put(
+            (self._finish_ai_comment, (file_path, cell_index, cell_content, question, ai_response))
+        )
+
+    def _ai_comment_failed(self, error):
+        """Let another @chat through after the worker raised instead of answering"""
+        self._ai_request_pending = False
+        self.path_label.config(text=f"❌ AI request failed: {error}")
+
+    def _finish_ai_comment(self, file_path, cell_index, cell_content, question, ai_response):
+        """Save an @chat question and its answer, refreshing the view if it still shows that cell"""
+        self._ai_request_pending = False
+
+        # Save both the question and the response as comments
+        question_comment = f"@chat {question}"
+        self.add_comment(file_path, cell_content, cell_index, question_comment)
+
+        ai_comment = f"🤖 AI: {ai_response}"
+        self.add_comment(file_path, cell_content, cell_index, ai_comment)
+
+        # The user may have moved to another cell or file while waiting
+        self.path_label.config(text=self.current_file)
+        if file_path != self.current_file or cell_index != self.current_cell:
+            return
+
+        # Queue for narration if enabled
+        if self.narrate_comments:
+            # Get total comments to determine comment numbers
+            total, _ = self.count_comments(file_path, cell_content)
+            # Queue the question (second to last comment)
+            if total >= 2:
+                self.queue_comment_narration(question, total - 1, is_ai=False)
+            # Queue the AI response (last comment)
+            self.queue_comment_narration(ai_response, total, is_ai=True)
+
+        if self.viewing_comments:
+            self.refresh_comment_list()
+
     def save_comment(self, event):
         """Save comment from input"""
         comment_text = self.comment_input.get('1.0', tk.END).strip()
@@ -1614,41 +2112,35 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
                     self.root.after(2000, reset_label)
                     return 'break'
 
+                if self._ai_request_pending:
+                    self.path_label.config(text="🤖 Still waiting for the previous AI answer...")
+                    return 'break'
+
                 # Show loading message
                 self.path_label.config(text="🤖 Asking AI...")
-                self.root.update()
 
                 # Get previous comments for context
                 previous_comments = self.get_comments(self.current_file, cell_content, self.current_cell)
 
-                # Get full file content
-                try:
-                    with open(self.current_file, 'r', encoding='utf-8') as f:
-                        file_content = f.read()
-                except Exception as e:
-                    file_content = f"[Error reading file: {e}]"
-
-                # Call OpenAI with full context
-                ai_response = self.call_openai(question, cell_content, file_content, previous_comments)
-
-                # Save both the question and the response as comments
-                question_comment = f"@chat {question}"
-                self.add_comment(self.current_file, cell_content, self.current_cell, question_comment)
-
-                ai_comment = f"🤖 AI: {ai_response}"
-                self.add_comment(self.current_file, cell_content, self.current_cell, ai_comment)
-
-                print(f"DEBUG: AI question and response saved")
-
-                # Queue for narration if enabled
-                if self.narrate_comments:
-                    # Get total comments to determine comment numbers
-                    all_comments = self.get_comments(self.current_file, cell_content, self.current_cell)
-                    # Queue the question (second to last comment)
-                    if len(all_comments) >= 2:
-                        self.queue_comment_narration(question, len(all_comments) - 1, is_ai=False)
-                    # Queue the AI response (last comment)
-                    self.queue_comment_narration(ai_response, len(all_comments), is_ai=True)
+                # Large files go as the cells around this one; smaller ones are rebuilt from
+                # the loaded cells (the split only drops the newline before each heading),
+                # so @chat never re-reads the file
+                file_content = self._chat_excerpt(self.current_cell)
+                excerpt = file_content is not None
+                if not excerpt:
+                    file_content = '\n'.join(self.cells)
+
+                # The request runs on a daemon thread so the window stays responsive;
+                # _finish_ai_comment saves the answer back on the Tk thread
+                self._ai_request_pending = True
+                self.comment_input.delete('1.0', tk.END)
+                self._start_background_thread(
+                    self._ai_comment_worker,
+                    self.current_file, self.current_cell, cell_content, question, previous_comments,
+                    file_content, excerpt,
+                    on_error=self._ai_comment_failed
+                )
+                return 'break'
 
             else:
                 # Regular comment
@@ -1658,8 +2150,8 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
                 # Queue for narration if enabled
                 if self.narrate_comments and result:
                     # Get total comments to determine comment number
-                    all_comments = self.get_comments(self.current_file, cell_content, self.current_cell)
-                    self.queue_comment_narration(comment_text, len(all_comments), is_ai=False)
+                    total, _ = self.count_comments(self.current_file, cell_content)
+                    self.queue_comment_narration(comment_text, total, is_ai=False)
 
             print(f"DEBUG: File: {self.current_file}, Cell: {self.current_cell}")
             self.display_comments()
@@ -1667,40 +2159,38 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             print("DEBUG: Comment text was empty")
         return 'break'
 
-    def render_markdown_cell(self, content):
-        """Render markdown content for a single cell with basic formatting."""
-        import re
+    def cell_insert_args(self, content):
+        """Return the current cell's Text.insert arguments, cached per cell."""
+        # Revisiting a cell replays its tagged runs instead of re-parsing
+        cached = self._rendered_cells.get(self.current_cell)
+        if cached is not None and cached[0] is content:
+            return cached[1]
+        if len(content) > _PLAIN_CELL_CHARS:
+            # Line-by-line inline parsing dominates on huge cells (pasted logs and the like)
+            args = [_PLAIN_CELL_NOTE, ('comment_hint',), content + '\n', ('code_block',)]
+        else:
+            args = self.build_markdown_runs(content)
+        self._rendered_cells[self.current_cell] = (content, args)
+        return args
+
+    def build_markdown_runs(self, content):
+        """Parse a cell into Text.insert(index, text, tags, ...) arguments."""
         lines = content.split('\n')
         in_code_block = False
         fence_lang = ''
+        runs = []  # (text, tag) pieces, flushed to the widget in one insert
 
         def insert_inline(text):
             # simple inline parser for `code`, **bold**, *italic*, [text](url)
-            code_pat = re.compile(r"`([^`]+)`")
-            bold_pat = re.compile(r"\*\*([^*]+)\*\*")
-            italic_pat = re.compile(r"(?<!\*)\*([^*]+)\*(?!\*)")
-            link_pat = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
-
             pos = 0
-            while pos < len(text):
-                # find earliest of code/bold/italic/link
-                candidates = []
-                for pat, tag in ((code_pat, 'inline_code'), (bold_pat, 'bold'), (italic_pat, 'italic'), (link_pat, 'link')):
-                    m = pat.search(text, pos)
-                    if m:
-                        candidates.append((m.start(), m, tag))
-                if not candidates:
-                    self.text_widget.insert(tk.END, text[pos:])
-                    break
-                candidates.sort(key=lambda x: x[0])
-                start, m, tag = candidates[0]
-                if start > pos:
-                    self.text_widget.insert(tk.END, text[pos:start])
-                if tag == 'link':
-                    self.text_widget.insert(tk.END, m.group(1), 'link')
-                else:
-                    self.text_widget.insert(tk.END, m.group(1), tag)
+            for m in _INLINE_RE.finditer(text):
+                if m.start() > pos:
+                    runs.append((text[pos:m.start()], None))
+                tag = m.lastgroup
+                runs.append((m.group(tag), tag))
                 pos = m.end()
+            if pos < len(text):
+                runs.append((text[pos:], None))
 
         for line in lines:
             # fenced code
@@ -1708,150 +2198,283 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
                 if not in_code_block:
                     fence_lang = line.strip('`').strip()
                     if fence_lang:
-                        self.text_widget.insert(tk.END, fence_lang + '\n', 'code_block')
+                        runs.append((fence_lang + '\n', 'code_block'))
                     in_code_block = True
                 else:
                     in_code_block = False
                 continue
 
             if in_code_block:
-                self.text_widget.insert(tk.END, line + '\n', 'code_block')
+                runs.append((line + '\n', 'code_block'))
                 continue
 
             # headings
             if line.startswith('#'):
                 level = len(line) - len(line.lstrip('#'))
                 text = line[level:].strip()
-                tag = f'h{min(level,6)}'
-                self.text_widget.insert(tk.END, text + '\n', tag)
+                tag = _HEADING_TAGS[min(level, 6)]
+                runs.append((text + '\n', tag))
                 continue
 
             # blockquote
             if line.startswith('>'):
-                self.text_widget.insert(tk.END, line.lstrip('> ').rstrip() + '\n', 'blockquote')
+                runs.append((line.lstrip('> ').rstrip() + '\n', 'blockquote'))
                 continue
 
             stripped = line.lstrip()
             # unordered list
             if stripped.startswith(('-', '*', '+')):
                 bullet_text = '• ' + stripped[1:].lstrip()
-                self.text_widget.insert(tk.END, bullet_text + '\n', 'list_item')
+                runs.append((bullet_text + '\n', 'list_item'))
                 continue
             # ordered list
-            if re.match(r"^\s*\d+\.", line):
-                self.text_widget.insert(tk.END, line.strip() + '\n', 'list_item')
+            if _OL_RE.match(line):
+                runs.append((line.strip() + '\n', 'list_item'))
                 continue
 
             # paragraph spacing on blank lines
             if not line.strip():
-                self.text_widget.insert(tk.END, '\n', 'paragraph')
+                runs.append(('\n', 'paragraph'))
                 continue
 
             # normal text with inline markup
             insert_inline(line + '\n')
 
+        # Merge same-tag neighbours so Tk gets the whole cell as
+        # insert(index, text, tags, text, tags, ...) in a single call
+        args = []
+        for tag, group in itertools.groupby(runs, key=itemgetter(1)):
+            args.append(''.join(text for text, _ in group))
+            args.append((tag,) if tag else ())
+        return args
+
     def parse_markdown_cells(self, content):
         """Parse markdown content into cells based on headings"""
-        # Safety limit - don't parse files that are too large
-        if len(content) > 5 * 1024 * 1024:  # 5MB text limit
-            self.cells = ["[File too large to parse into cells - displaying as single block]", content[:100000]]
-            return
-
-        lines = content.split('\n')
-
-        # Safety limit on number of lines
-        if len(lines) > 50000:
-            lines = lines[:50000]
-
-        current_cell = []
-
-        for line in lines:
-            if line.startswith('#') and current_cell:
-                self.cells.append('\n'.join(current_cell))
-                current_cell = [line]
-            else:
-                current_cell.append(line)
-
-        if current_cell:
-            self.cells.append('\n'.join(current_cell))
-
-        if not self.cells:
-            self.cells = [content]
-
-        # Limit number of cells to prevent UI freeze
-        if len(self.cells) > 1000:
-            self.cells = self.cells[:1000] + ["[Remaining cells truncated - file too large]"]
+        self.cells = _split_markdown_cells(content)
+
+    def display_file(self, file_path, cell_index=0):
+        """Display file content, opening markdown at the given cell"""
+        # Re-selecting the open, unchanged file keeps the reader where it is,
+        # unless the rendered Python outline is up: then it leads back to the text view
+        python_view = self.py_frame is not None and self.py_frame.winfo_ismapped()
+        if file_path == self.current_file and self._current_file_stamp is not None and not python_view:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                st = None
+            if st is not None and (st.st_mtime_ns, st.st_size) == self._current_file_stamp:
+                return
 
-    def display_file(self, file_path):
-        """Display file content"""
         # Ensure comment dictation stops when switching files
         self.stop_comment_dictation()
         self.current_comment_reading_index = -1
 
         self.path_label.config(text=file_path)
         self.current_file = file_path
+        self._current_file_stamp = None
         self.text_widget.delete('1.0', tk.END)
         self.cells = []
+        self._rendered_cells = {}
         self.current_cell = 0
         self.viewing_comments = False
 
+        # Any read still in flight for a previously selected file is now stale
+        self._file_load_seq += 1
+        if self._pending_render is not None:
+            self.root.after_cancel(self._pending_render)
+            self._pending_render = None
+
         # Save session state when file is opened
         self.save_session_state()
 
+        # One grouped query per file instead of one per cell navigation
+        self.load_comment_counts(file_path)
+
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            st = os.stat(file_path)
+        except OSError as e:
+            self.text_widget.insert('1.0', f"Error reading file:\n{str(e)}")
+            return
+        # Size as well as mtime: coarse mtimes can miss a same-second rewrite
+        stamp = (st.st_mtime_ns, st.st_size)
+        self._current_file_stamp = stamp
+
+        if file_path.endswith('.md'):
+            cached = self._file_cache.get(file_path)
+            if cached and cached[0] == stamp:
+                self._file_cache.move_to_end(file_path)
+                self.cells = cached[1]
+                self.remember_cell_keys(cached[1], cached[2])
+                self.show_markdown_cells(cell_index)
+                return
 
-            if file_path.endswith('.md'):
-                # Ensure text view visible, Python view hidden
-                self.show_text_view()
-                self.text_widget.tag_configure('h1', font=('Consolas', 18, 'bold'), foreground='#569cd6', spacing3=10)
-                self.text_widget.tag_configure('h2', font=('Consolas', 16, 'bold'), foreground='#4ec9b0', spacing3=8)
-                self.text_widget.tag_configure('h3', font=('Consolas', 14, 'bold'), foreground='#4ec9b0', spacing3=6)
-                self.text_widget.tag_configure('h4', font=('Consolas', 12, 'bold'), foreground='#4ec9b0', spacing3=4)
-                self.text_widget.tag_configure('h5', font=('Consolas', 11, 'bold'), foreground='#4ec9b0', spacing3=4)
-                self.text_widget.tag_configure('h6', font=('Consolas', 11, 'bold'), foreground='#4ec9b0', spacing3=4)
-                self.text_widget.tag_configure('code_block', background='#2d2d2d', foreground='#ce9178', font=('Monaco', 10), lmargin1=16, lmargin2=16, spacing1=2, spacing3=6)
-                self.text_widget.tag_configure('blockquote', foreground='#6a9955', lmargin1=20, lmargin2=20)
-                self.text_widget.tag_configure('list_item', lmargin1=24, lmargin2=48, spacing1=1, spacing3=1)
-                self.text_widget.tag_configure('paragraph', spacing1=2, spacing3=6)
-                self.text_widget.tag_configure('inline_code', background='#2d2d2d', foreground='#ce9178', font=('Monaco', 10))
-                self.text_widget.tag_configure('bold', font=('Consolas', 11, 'bold'))
-                self.text_widget.tag_configure('italic', font=('Consolas', 11, 'italic'))
-                self.text_widget.tag_configure('link', foreground='#4aa3ff', underline=True)
-                self.text_widget.tag_configure('cell_indicator', foreground='#888888', font=('Consolas', 10))
-                self.text_widget.tag_configure('separator', foreground='#444444')
-                self.text_widget.tag_configure('comment_hint', foreground='#ffd700')
-                self.text_widget.tag_configure('comment_header', foreground='#ffd700', font=('Consolas', 12, 'bold'))
-                self.text_widget.tag_configure('comment_number', foreground='#888888', font=('Consolas', 10, 'bold'))
-                self.text_widget.tag_configure('comment_text', foreground='#d4d4d4')
-                self.text_widget.tag_configure('comment_date', foreground='#666666', font=('Consolas', 9))
-                self.text_widget.tag_configure('no_comments', foreground='#888888', font=('Consolas', 10, 'italic'))
-                self.text_widget.tag_configure('instructions', foreground='#888888')
-
-                self.parse_markdown_cells(content)
-
-                if self.cells:
-                    self.display_current_cell()
-            elif file_path.endswith('.py'):
+        # Read off the Tk thread so slow disks don't freeze the event loop
+        self._load_file_async(file_path, stamp, cell_index)
+
+    def _load_file_async(self, file_path, stamp, cell_index):
+        """Submit a read to the worker pool and start polling for its result."""
+        self._submit_background(
+            self._read_file_worker, self._file_load_seq, file_path, stamp, cell_index,
+            on_error=partial(self._show_file_error, self._file_load_seq)
+        )
+
+    def _submit_background(self, worker, *args, on_error=None):
+        """Run worker on the pool; it must post exactly one (callback, args) to _load_results.
+
+        A worker that raises instead posts on_error(exception), so the poll
+        loop still sees one result per submission.
+        """
+        future = self._load_executor.submit(worker, *args)
+        future.add_done_callback(partial(self._background_done, on_error))
+        self._expect_background_result()
+
+    def _start_background_thread(self, worker, *args, on_error=None):
+        """Like _submit_background, but on a daemon thread of its own, for long blocking waits."""
+        self._expect_background_result()
+        threading.Thread(target=self._run_background_thread, args=(worker, args, on_error), daemon=True).start()
+
+    def _run_background_thread(self, worker, args, on_error):
+        """Run a _start_background_thread worker, posting on_error(exception) if it raises."""
+        try:
+            worker(*args)
+        except Exception as e:
+            self._load_results.put((on_error or self._report_background_error, (e,)))
+
+    def _expect_background_result(self):
+        """Count one result due on _load_results and make sure _poll_load is running."""
+        self._loads_in_flight += 1
+        if self._load_poll_job is None:
+            self._load_poll_job = self.root.after(16, self._poll_load)
+
+    def _background_done(self, on_error, future):
+        """Post the failure of a worker that raised (runs on the worker thread)."""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._load_results.put((on_error or self._report_background_error, (error,)))
+
+    def _report_background_error(self, error):
+        """Default on_error for background workers: log and move on."""
+        print(f"Error in background task: {error}")
+
+    def _poll_load(self):
+        """Drain finished reads on the Tk thread; keep polling while any are outstanding."""
+        self._load_poll_job = None
+        while True:
+            try:
+                callback, args = self._load_results.get_nowait()
+            except queue.Empty:
+                break
+            self._loads_in_flight -= 1
+            try:
+                callback(*args)
+            except Exception:
+                # One failing callback mustn't strand the results queued behind it
+                self.root.report_callback_exception(*sys.exc_info())
+        if self._loads_in_flight > 0:
+            self._load_poll_job = self.root.after(16, self._poll_load)
+
+    def _read_file_worker(self, load_seq, file_path, stamp, cell_index):
+        """Read up to _MAX_READ_BYTES of a file on a worker thread."""
+        try:
+            with open(file_path, 'rb') as f:
+                raw = f.read(_MAX_READ_BYTES + 1)
+        except Exception as e:
+            self._load_results.put((self._show_file_error, (load_seq, e)))
+            return
+
+        # Only slice (a full copy) when there is actually a spare byte to drop
+        truncated = len(raw) > _MAX_READ_BYTES
+        if truncated:
+            raw = raw[:_MAX_READ_BYTES]
+        content = raw.decode('utf-8', 'replace')
+        del raw
+
+        # Markdown is split into cells here too, so the Tk thread only swaps them in
+        if file_path.endswith('.md'):
+            cells = _split_markdown_cells(content)
+            if truncated:
+                cells.append(_TRUNCATED_NOTE)
+            # Hash every cell up front so comment lookups never hash on the Tk thread
+            keys = self.compute_cell_keys(cells)
+            self._load_results.put((self._apply_markdown_cells, (load_seq, file_path, stamp, cell_index, cells, keys)))
+            return
+
+        self._load_results.put((self._apply_file_content, (load_seq, file_path, stamp, cell_index, content, truncated)))
+
+    def _show_file_error(self, load_seq, error):
+        """Report a failed background read, unless another file was opened since."""
+        if load_seq != self._file_load_seq:
+            return
+        # Let a later click retry the read
+        self._current_file_stamp = None
+        self.text_widget.insert('1.0', f"Error reading file:\n{str(error)}")
+
+    def _apply_markdown_cells(self, load_seq, file_path, stamp, cell_index, cells, keys):
+        """Show cells split by _read_file_worker and remember them for reopening."""
+        if load_seq != self._file_load_seq:
+            return
+
+        self.cells = cells
+        self.remember_cell_keys(cells, keys)
+        if stamp[1] <= _FILE_CACHE_MAX_BYTES:
+            self._file_cache[file_path] = (stamp, cells, keys)
+            self._file_cache.move_to_end(file_path)
+            if len(self._file_cache) > _FILE_CACHE_ENTRIES:
+                self._file_cache.popitem(last=False)
+        else:
+            self._file_cache.pop(file_path, None)
+
+        self.show_markdown_cells(cell_index)
+
+    def _apply_file_content(self, load_seq, file_path, stamp, cell_index, content, truncated):
+        """Show content read by _read_file_worker (runs on the Tk thread)."""
+        if load_seq != self._file_load_seq:
+            return
+
+        try:
+            if file_path.endswith('.py'):
                 # Show Python as plain text initially (render outline on demand)
                 self.show_text_view()
-                self.text_widget.insert('1.0', content)
                 # Show render button for Python files
                 self.show_python_render_button()
+                self._stream_text(load_seq, content)
             else:
                 self.show_text_view()
-                self.text_widget.insert('1.0', content)
+                self._stream_text(load_seq, content, note=f"\n\n{_TRUNCATED_NOTE}" if truncated else '')
 
         except Exception as e:
             self.text_widget.insert('1.0', f"Error reading file:\n{str(e)}")
 
+    def _stream_text(self, load_seq, content, pos=0, note=''):
+        """Append content in _INSERT_CHUNK_CHARS pieces so large files paint without stalling Tk."""
+        if load_seq != self._file_load_seq:
+            return
+        end = pos + _INSERT_CHUNK_CHARS
+        if pos == 0 and end >= len(content):
+            self.text_widget.insert(tk.END, content)
+        else:
+            self.text_widget.insert(tk.END, content[pos:end])
+        if end < len(content):
+            self.root.after_idle(self._stream_text, load_seq, content, end, note)
+        elif note:
+            self.text_widget.insert(tk.END, note)
+
+    def show_markdown_cells(self, cell_index=0):
+        """Show the parsed markdown cells, starting at cell_index when it exists."""
+        # Ensure text view visible, Python view hidden
+        self.show_text_view()
+
+        if self.cells:
+            if 0 <= cell_index < len(self.cells):
+                self.current_cell = cell_index
+            self.display_current_cell()
+
     def show_text_view(self):
         """Ensure the plain text/markdown view is visible and Python view hidden."""
-        try:
+        if self.py_frame is not None:
             self.py_frame.pack_forget()
-        except Exception:
-            pass
         # Show text frame
         if not self.text_frame.winfo_ismapped():
             self.text_frame.pack(fill=tk.BOTH, expand=True)
@@ -1870,7 +2493,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             fg=self.button_text_color,
             activebackground=self.button_active_color,
             activeforeground=self.button_text_color,
-            font=('Consolas', 10, 'bold'),
+            font=_FONT_UI_BOLD,
             relief=tk.RAISED,
             padx=20,
             pady=8,
@@ -1887,7 +2510,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             text="Click to parse Python file and show class/function outline",
             bg=self.bg_color,
             fg="#888888",
-            font=('Consolas', 9)
+            font=_FONT_SMALL
         )
         instruction_label.pack(pady=(0, 10))
 
@@ -1937,6 +2560,45 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             self.text_widget.insert('1.0', f"Error rendering Python file:\n{str(e)}")
             self.path_label.config(text=self.current_file)
 
+    def _ensure_py_frame(self):
+        """Create the Python outline + code viewer widgets the first time they're needed"""
+        if self.py_frame is not None:
+            return
+
+        self.py_frame = tk.PanedWindow(self._py_parent, orient=tk.HORIZONTAL, bg=self.bg_color, sashwidth=5, sashrelief=tk.FLAT)
+        # Left: outline tree
+        outline_container = tk.Frame(self.py_frame, bg=self.bg_color)
+        self.py_outline = ttk.Treeview(outline_container, selectmode='browse')
+        self.py_outline.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.py_frame.add(outline_container, width=280)
+
+        # Right: code/details
+        code_container = tk.Frame(self.py_frame, bg=self.bg_color)
+        self.py_text = tk.Text(
+            code_container,
+            bg=self.bg_color,
+            fg=self.fg_color,
+            insertbackground=self.fg_color,
+            selectbackground=self.select_color,
+            font=('Consolas', 11),
+            wrap=tk.NONE,
+            padx=10,
+            pady=10
+        )
+        self.py_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.py_frame.add(code_container)
+
+        # Snippet and highlight styles (configured once; later tags take priority)
+        self.py_text.tag_configure('h2', font=('Consolas', 14, 'bold'), foreground='#4ec9b0', spacing3=6)
+        self.py_text.tag_configure('doc', foreground='#aaaaaa', font=('Consolas', 10, 'italic'))
+        self.py_text.tag_configure('code', font=('Monaco', 10))
+        self.py_text.tag_configure('kw', foreground='#569cd6')
+        self.py_text.tag_configure('str', foreground='#ce9178')
+        self.py_text.tag_configure('com', foreground='#6a9955')
+
+        # Outline selection handler
+        self.py_outline.bind('<<TreeviewSelect>>', self.on_python_symbol_select)
+
     def show_python_view(self, file_path, content):
         """Show the Python outline + code viewer for the given file content."""
         # Cache the content to avoid re-reading file on every symbol select
@@ -1949,6 +2611,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
             pass
 
         # Show python frame if not shown
+        self._ensure_py_frame()
         if not self.py_frame.winfo_ismapped():
             self.py_frame.pack(fill=tk.BOTH, expand=True)
 
@@ -1957,74 +2620,37 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
 
     def build_python_outline(self, file_path, content):
         """Parse Python AST and populate the outline tree."""
-        import ast
         self.py_outline.delete(*self.py_outline.get_children())
         self.py_text.delete('1.0', tk.END)
 
-        try:
-            tree = ast.parse(content)
-        except Exception as e:
-            self.py_text.insert('1.0', f"Error parsing Python file: {e}")
-            return
-
-        lines = content.splitlines()
-
-        # Helper to get end lineno if available
-        def get_end_lineno(node):
-            return getattr(node, 'end_lineno', getattr(node, 'lineno', 1))
+        # Outlines are kept per content digest, so reopening an unchanged file skips ast.parse
+        key = hashlib.sha256(content.encode('utf-8', 'surrogatepass')).digest()
+        outline = self._py_outline_rows.get(key)
+        if outline is None:
+            try:
+                outline = _python_outline(content)
+            except Exception as e:
+                self.py_text.insert('1.0', f"Error parsing Python file: {e}")
+                return
+            self._py_outline_rows[key] = outline
+            if len(self._py_outline_rows) > _PY_OUTLINE_CACHE_ENTRIES:
+                self._py_outline_rows.popitem(last=False)
+        self._py_outline_rows.move_to_end(key)
 
         # Root node
-        root_id = self.py_outline.insert('', 'end', text=os.path.basename(file_path), values=("module", 1, len(lines)))
+        line_count, rows = outline
+        root_id = self.py_outline.insert('', 'end', text=os.path.basename(file_path), values=("module", 1, line_count))
 
         # Cache docstrings by iid
         self._py_outline_cache.clear()
-
-        # Limit top-level items to prevent UI freeze on huge files
-        max_top_level_items = 500
-        items_processed = 0
-
-        for node in tree.body:
-            if items_processed >= max_top_level_items:
-                # Add indicator that outline was truncated
-                self.py_outline.insert(root_id, 'end', text=f"... ({len(tree.body) - items_processed} more items truncated)", values=("truncated", 0, 0))
-                break
-            items_processed += 1
-            if isinstance(node, ast.ClassDef):
-                doc = ast.get_docstring(node) or ""
-                iid = self.py_outline.insert(root_id, 'end', text=f"class {node.name}", values=("class", node.lineno, get_end_lineno(node)))
-                self._py_outline_cache[iid] = {"doc": doc, "type": "class"}
-
-                # Limit methods per class to prevent UI freeze
-                max_methods_per_class = 100
-                methods_processed = 0
-
-                for sub in node.body:
-                    if isinstance(sub, ast.FunctionDef) or isinstance(sub, ast.AsyncFunctionDef):
-                        if methods_processed >= max_methods_per_class:
-                            # Add indicator that methods were truncated
-                            remaining = sum(1 for s in node.body if isinstance(s, (ast.FunctionDef, ast.AsyncFunctionDef))) - methods_processed
-                            self.py_outline.insert(iid, 'end', text=f"... ({remaining} more methods truncated)", values=("truncated", 0, 0))
-                            break
-                        methods_processed += 1
-
-                        sdoc = ast.get_docstring(sub) or ""
-                        smark = "async def" if isinstance(sub, ast.AsyncFunctionDef) else "def"
-                        sid = self.py_outline.insert(iid, 'end', text=f"{smark} {sub.name}()", values=("method", sub.lineno, get_end_lineno(sub)))
-                        self._py_outline_cache[sid] = {"doc": sdoc, "type": "method"}
-            elif isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
-                doc = ast.get_docstring(node) or ""
-                mark = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
-                iid = self.py_outline.insert(root_id, 'end', text=f"{mark} {node.name}()", values=("function", node.lineno, get_end_lineno(node)))
-                self._py_outline_cache[iid] = {"doc": doc, "type": "function"}
-            elif isinstance(node, ast.Assign):
-                # show top-level assignment names
-                names = []
-                for t in node.targets:
-                    if isinstance(t, ast.Name):
-                        names.append(t.id)
-                if names:
-                    text = ", ".join(names)
-                    self.py_outline.insert(root_id, 'end', text=f"const {text}", values=("const", node.lineno, get_end_lineno(node)))
+        for text, values, meta, children in rows:
+            iid = self.py_outline.insert(root_id, 'end', text=text, values=values)
+            if meta is not None:
+                self._py_outline_cache[iid] = meta
+            for stext, svalues, smeta, _ in children:
+                sid = self.py_outline.insert(iid, 'end', text=stext, values=svalues)
+                if smeta is not None:
+                    self._py_outline_cache[sid] = smeta
 
         self.py_outline.item(root_id, open=True)
         # Select root by default
@@ -2037,7 +2663,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
         if not sel:
             return
         iid = sel[0]
-        vals = self.py_outline.item(iid).get('values')
+        vals = self.py_outline.item(iid, 'values')
         if not vals or len(vals) < 3:
             return
         node_type, start, end = vals[0], int(vals[1]), int(vals[2])
@@ -2061,7 +2687,7 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
 
         # Render into right text
         self.py_text.delete('1.0', tk.END)
-        header = self.py_outline.item(iid).get('text')
+        header = self.py_outline.item(iid, 'text')
         self.py_text.insert(tk.END, f"{header}\n", ('h2',))
         if doc:
             first_line = doc.splitlines()[0]
@@ -2069,63 +2695,48 @@ class FileViewer(DatabaseMixin, NavigationStateMixin, CommentAudioMixin):
 
         self.py_text.insert(tk.END, snippet, ('code',))
 
-        # Basic styles
-        self.py_text.tag_configure('h2', font=('Consolas', 14, 'bold'), foreground='#4ec9b0', spacing3=6)
-        self.py_text.tag_configure('doc', foreground='#aaaaaa', font=('Consolas', 10, 'italic'))
-        self.py_text.tag_configure('code', font=('Monaco', 10))
-
         # Optional: simple syntax highlight
         self.syntax_highlight_python()
 
     def syntax_highlight_python(self):
         """Very simple Python syntax highlighting for the current py_text buffer."""
-        import re
         text = self.py_text
-        code_start = '1.0'
-        # configure tags
-        text.tag_configure('kw', foreground='#569cd6')
-        text.tag_configure('str', foreground='#ce9178')
-        text.tag_configure('com', foreground='#6a9955')
-        # keywords
-        keywords = r"\b(False|class|finally|is|return|None|continue|for|lambda|try|True|def|from|nonlocal|while|and|del|global|not|with|as|elif|if|or|yield|assert|else|import|pass|break|except|in|raise)\b"
         content = text.get('1.0', tk.END)
         # clear previous tags
-        for tag in ('kw','str','com'):
+        for tag in ('kw', 'str', 'com'):
             text.tag_remove(tag, '1.0', tk.END)
-        # strings
-        for m in re.finditer(r"(?s)('''.*?'''|\"\"\".*?\"\"\"|'[^'\n]*'|\"[^\"\n]*\")", content):
-            start = f"1.0+{m.start()}c"
-            end = f"1.0+{m.end()}c"
-            text.tag_add('str', start, end)
-        # comments
-        for m in re.finditer(r"#[^\n]*", content):
-            start = f"1.0+{m.start()}c"
-            end = f"1.0+{m.end()}c"
-            text.tag_add('com', start, end)
-        # keywords (after strings/comments to avoid coloring inside)
-        for m in re.finditer(keywords, content):
-            start = f"1.0+{m.start()}c"
-            end = f"1.0+{m.end()}c"
-            # Skip if inside a string/comment tag
-            ranges = text.tag_ranges('str') + text.tag_ranges('com')
-            inside = False
-            for i in range(0, len(ranges), 2):
-                if text.compare(start, '>=', ranges[i]) and text.compare(end, '<=', ranges[i+1]):
-                    inside = True
-                    break
-            if not inside:
-                text.tag_add('kw', start, end)
+
+        # Match offsets in Python and tag each kind with one tag_add call
+        spans = {'str': [], 'com': [], 'kw': []}
+        for m in _PY_HIGHLIGHT_RE.finditer(content):
+            spans[m.lastgroup].extend(m.span())
+
+        # Hand Tk "line.col" indices; "1.0+Nc" makes it count N characters from the top per index
+        line_starts = [0]
+        line_starts.extend(m.end() for m in _NEWLINE_RE.finditer(content))
+
+        def index(pos):
+            line = bisect.bisect_right(line_starts, pos)
+            return f"{line}.{pos - line_starts[line - 1]}"
+
+        for tag, positions in spans.items():
+            if positions:
+                text.tag_add(tag, *map(index, positions))
 
 
 def main():
     root = tk.Tk()
     app = FileViewer(root)
+    # Backstop for exits that skip on_closing (close() is a no-op when already closed)
+    atexit.register(app.conn.close)
 
     def on_closing():
         app.save_session_state()
         app.save_navigation_state()
-        app.conn.close()
+        app._load_executor.shutdown(wait=False, cancel_futures=True)
+        # Take the window down first; the final WAL checkpoint in close() happens after
         root.destroy()
+        app.conn.close()
 
     root.protocol("WM_DELETE_WINDOW", on_closing)
     root.mainloop()
@@ -1,8 +1,14 @@
 """Database mixin for Lenk file viewer."""
 
+import hashlib
 import os
+import re
 import sqlite3
-from typing import List, Optional, Tuple
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# First line starting with '#': the cell's first non-blank line, or any later line at column 0
+_HEADING_LINE_RE = re.compile(r'\A\s*(#[^\n]*)|^(#[^\n]*)', re.MULTILINE)
 
 
 class DatabaseMixin:
@@ -10,12 +16,24 @@ class DatabaseMixin:
 
     conn: sqlite3.Connection
     cursor: sqlite3.Cursor
+    _starred_cache: Set[str] = set()
+    _comment_counts: Dict[Tuple[str, str, str], int] = {}
+    _comment_counts_file: Optional[str] = None
+    _cell_keys: Dict[str, Tuple[str, str]] = {}
+    _comments_cache: Dict[Tuple[str, str], List[Tuple[str, str, str]]] = {}
 
     def init_database(self) -> None:
         """Initialize SQLite database for starred items, comments, and settings."""
         db_path = os.path.expanduser("~/.file_viewer_stars.db")
         self.conn = sqlite3.connect(db_path)
         self.cursor = self.conn.cursor()
+        # WAL + NORMAL sync keeps interactive writes (stars, comments) off the fsync path
+        self.cursor.execute('PRAGMA journal_mode=WAL')
+        self.cursor.execute('PRAGMA synchronous=NORMAL')
+        self.cursor.execute('PRAGMA temp_store=MEMORY')
+        # Keep the read-mostly working set resident: ~50 MB page cache, 256 MB mmap
+        self.cursor.execute('PRAGMA cache_size=-50000')
+        self.cursor.execute('PRAGMA mmap_size=268435456')
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS starred (
                 path TEXT PRIMARY KEY,
@@ -35,6 +53,16 @@ class DatabaseMixin:
                 match_confidence TEXT DEFAULT 'exact'
             )
         ''')
+        # get_comments filters on file + heading and sorts by created_at
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_comments_file_heading
+            ON comments (file_path, heading_text, created_at)
+        ''')
+        # Exact (file + heading + hash) lookups and the per-file count grouping
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_comments_file_heading_hash
+            ON comments (file_path, heading_text, content_hash, created_at)
+        ''')
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS settings (
                 key TEXT PRIMARY KEY,
@@ -51,6 +79,7 @@ class DatabaseMixin:
             )
         ''')
         self.conn.commit()
+        self.load_starred_cache()
 
     def load_settings(self) -> None:
         """Load top-level settings from the database."""
@@ -68,11 +97,17 @@ class DatabaseMixin:
 
     def save_setting(self, key: str, value: str) -> None:
         """Persist a single setting key/value pair."""
-        self.cursor.execute(
-            'INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)',
-            (key, str(value))
-        )
-        self.conn.commit()
+        self.save_settings({key: value})
+
+    def save_settings(self, settings: Dict[str, str]) -> None:
+        """Persist several settings in a single transaction."""
+        if not settings:
+            return
+        with self.conn:
+            self.cursor.executemany(
+                'INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)',
+                [(key, str(value)) for key, value in settings.items()]
+            )
 
     def get_setting(self, key: str) -> Optional[str]:
         """Fetch a setting value by key."""
@@ -95,20 +130,23 @@ class DatabaseMixin:
         return result if result else (None, None, 0)
 
     # Starred items -----------------------------------------------------
+    def load_starred_cache(self) -> None:
+        """Reload the in-memory set of starred paths used by is_starred."""
+        self.cursor.execute('SELECT path FROM starred')
+        self._starred_cache = {row[0] for row in self.cursor.fetchall()}
+
     def is_starred(self, path: str) -> bool:
-        self.cursor.execute('SELECT 1 FROM starred WHERE path = ?', (path,))
-        return self.cursor.fetchone() is not None
+        return path in self._starred_cache
 
     def add_star(self, path: str) -> None:
-        try:
-            self.cursor.execute('INSERT INTO starred (path) VALUES (?)', (path,))
-            self.conn.commit()
-        except sqlite3.IntegrityError:
-            pass
+        with self.conn:
+            self.cursor.execute('INSERT OR IGNORE INTO starred (path) VALUES (?)', (path,))
+        self._starred_cache.add(path)
 
     def remove_star(self, path: str) -> None:
-        self.cursor.execute('DELETE FROM starred WHERE path = ?', (path,))
-        self.conn.commit()
+        with self.conn:
+            self.cursor.execute('DELETE FROM starred WHERE path = ?', (path,))
+        self._starred_cache.discard(path)
 
     def get_starred_items(self) -> List[str]:
         self.cursor.execute('SELECT path FROM starred ORDER BY starred_at DESC')
@@ -116,23 +154,51 @@ class DatabaseMixin:
 
     # Comments ----------------------------------------------------------
     def get_cell_hash(self, content: str) -> str:
-        import hashlib
-
-        return hashlib.md5(content.encode('utf-8')).hexdigest()
+        # Stored in comments.content_hash, so the algorithm has to stay md5
+        return hashlib.md5(content.encode('utf-8'), usedforsecurity=False).hexdigest()
 
     def extract_heading(self, cell_content: str) -> str:
-        lines = cell_content.strip().split('\n')
-        for line in lines:
-            if line.startswith('#'):
-                return line.strip()
+        match = _HEADING_LINE_RE.search(cell_content)
+        if match:
+            return (match.group(1) or match.group(2)).strip()
         return "[No Heading]"
 
+    def cell_key(self, cell_content: str) -> Tuple[str, str]:
+        """Return (heading, content hash) for a cell, memoized per open file."""
+        key = self._cell_keys.get(cell_content)
+        if key is None:
+            key = (self.extract_heading(cell_content), self.get_cell_hash(cell_content))
+            self._cell_keys[cell_content] = key
+        return key
+
+    def compute_cell_keys(self, cells: List[str]) -> List[Tuple[str, str]]:
+        """Return cell_key for every cell without touching the memo, so it can run on a worker."""
+        return [(self.extract_heading(cell), self.get_cell_hash(cell)) for cell in cells]
+
+    def remember_cell_keys(self, cells: List[str], keys: List[Tuple[str, str]]) -> None:
+        """Seed the cell_key memo with keys from compute_cell_keys."""
+        self._cell_keys.update(zip(cells, keys))
+
     def get_comments(self, file_path: str, cell_content: str, cell_index: int) -> List[Tuple[str, str, str]]:
-        heading = self.extract_heading(cell_content)
-        content_hash = self.get_cell_hash(cell_content)
+        key = self.cell_key(cell_content)
+        # Matches for the open file are kept until a comment is added or a
+        # stored confidence changes under the same heading
+        cacheable = file_path == self._comment_counts_file
+        if cacheable and key in self._comments_cache:
+            return self._comments_cache[key]
 
+        comments, repeat = self._match_comments(file_path, *key)
+        if cacheable:
+            self._comments_cache[key] = repeat
+        return comments
+
+    def _match_comments(self, file_path: str, heading: str, content_hash: str):
+        """Query exact (heading + hash) matches, falling back to every comment under the heading.
+
+        Returns (comments, what the same lookup returns once this one's touch is stored).
+        """
         self.cursor.execute(
-            '''SELECT id, comment_text, created_at, match_confidence
+            '''SELECT id, content_hash, comment_text, created_at, match_confidence
                FROM comments
                WHERE file_path = ? AND heading_text = ? AND content_hash = ?
                ORDER BY created_at''',
@@ -141,16 +207,13 @@ class DatabaseMixin:
         exact_matches = self.cursor.fetchall()
 
         if exact_matches:
-            for comment_id, *_ in exact_matches:
-                self.cursor.execute(
-                    'UPDATE comments SET last_matched_at = CURRENT_TIMESTAMP, match_confidence = ? WHERE id = ?',
-                    ('exact', comment_id)
-                )
-            self.conn.commit()
-            return [(text, created, conf) for _, text, created, conf in exact_matches]
+            self._touch_comments(file_path, [(comment_id, heading, row_hash, conf)
+                                             for comment_id, row_hash, _, _, conf in exact_matches], 'exact')
+            return ([(text, created, conf) for _, _, text, created, conf in exact_matches],
+                    [(text, created, 'exact') for _, _, text, created, _ in exact_matches])
 
         self.cursor.execute(
-            '''SELECT id, comment_text, created_at, match_confidence
+            '''SELECT id, content_hash, comment_text, created_at, match_confidence
                FROM comments
                WHERE file_path = ? AND heading_text = ?
                ORDER BY created_at''',
@@ -159,28 +222,137 @@ class DatabaseMixin:
         heading_matches = self.cursor.fetchall()
 
         if heading_matches:
-            for comment_id, *_ in heading_matches:
-                self.cursor.execute(
-                    'UPDATE comments SET last_matched_at = CURRENT_TIMESTAMP, match_confidence = ? WHERE id = ?',
-                    ('fuzzy', comment_id)
-                )
-            self.conn.commit()
-            return [(text, created, 'fuzzy') for _, text, created, _ in heading_matches]
+            self._touch_comments(file_path, [(comment_id, heading, row_hash, conf)
+                                             for comment_id, row_hash, _, _, conf in heading_matches], 'fuzzy')
+            comments = [(text, created, 'fuzzy') for _, _, text, created, _ in heading_matches]
+            return comments, comments
+
+        return [], []
+
+    def get_comments_for_cells(self, file_path: str, cells: List[str]) -> List[List[Tuple[str, str, str]]]:
+        """Match comments to every cell with one query, as per-cell get_comments calls would in order."""
+        self.cursor.execute(
+            '''SELECT id, heading_text, content_hash, comment_text, created_at, match_confidence
+               FROM comments
+               WHERE file_path = ?
+               ORDER BY created_at, id''',
+            (file_path,)
+        )
+        by_heading = defaultdict(list)
+        confidence = {}  # comment id -> match_confidence as sequential get_comments calls would leave it
+        for row in self.cursor.fetchall():
+            by_heading[row[1]].append(row)
+            confidence[row[0]] = row[5]
 
-        return []
+        results = []
+        touched = {}  # comment id -> row as stored before this call
+        for cell_content in cells:
+            heading, content_hash = self.cell_key(cell_content)
+            heading_matches = by_heading.get(heading, ())
+            exact_matches = [row for row in heading_matches if row[2] == content_hash]
+            if exact_matches:
+                results.append([(text, created, confidence[comment_id])
+                                for comment_id, _, _, text, created, _ in exact_matches])
+                matched, state = exact_matches, 'exact'
+            elif heading_matches:
+                results.append([(text, created, 'fuzzy') for _, _, _, text, created, _ in heading_matches])
+                matched, state = heading_matches, 'fuzzy'
+            else:
+                results.append([])
+                continue
+            for row in matched:
+                confidence[row[0]] = state
+                touched[row[0]] = row
+
+        for state in ('exact', 'fuzzy'):
+            rows = [(comment_id, heading, content_hash, stored)
+                    for comment_id, heading, content_hash, _, _, stored in touched.values()
+                    if confidence[comment_id] == state]
+            if rows:
+                self._touch_comments(file_path, rows, state)
+        return results
+
+    def _touch_comments(self, file_path: str, rows, confidence: str) -> None:
+        """Stamp last_matched_at/match_confidence on matched rows in one statement batch.
+
+        rows are (id, heading, content hash, stored confidence); the cached
+        counts of the open file follow any confidence that changes, and cached
+        matches under those headings are dropped.
+        """
+        with self.conn:
+            self.cursor.executemany(
+                'UPDATE comments SET last_matched_at = CURRENT_TIMESTAMP, match_confidence = ? WHERE id = ?',
+                [(confidence, row[0]) for row in rows]
+            )
+        if file_path != self._comment_counts_file:
+            return
+        counts = self._comment_counts
+        changed_headings = set()
+        for _, heading, content_hash, stored in rows:
+            if stored != confidence:
+                changed_headings.add(heading)
+                old_key = (heading, content_hash, stored)
+                counts[old_key] -= 1
+                if not counts[old_key]:
+                    del counts[old_key]
+                new_key = (heading, content_hash, confidence)
+                counts[new_key] = counts.get(new_key, 0) + 1
+        if changed_headings:
+            for cached_key in [k for k in self._comments_cache if k[0] in changed_headings]:
+                del self._comments_cache[cached_key]
+
+    def load_comment_counts(self, file_path: str) -> None:
+        """Cache comment counts per (heading, content hash, stored match confidence) for one file."""
+        self.cursor.execute(
+            '''SELECT heading_text, content_hash, match_confidence, COUNT(*)
+               FROM comments
+               WHERE file_path = ?
+               GROUP BY heading_text, content_hash, match_confidence''',
+            (file_path,)
+        )
+        self._comment_counts = {(heading, content_hash, confidence): count
+                                for heading, content_hash, confidence, count in self.cursor.fetchall()}
+        self._comment_counts_file = file_path
+        self._cell_keys = {}
+        self._comments_cache = {}
+
+    def count_comments(self, file_path: str, cell_content: str) -> Tuple[int, int]:
+        """Return (total, fuzzy) comment counts for a cell using the cached counts.
+
+        Mirrors get_comments: exact (heading + hash) matches win and keep their
+        stored confidence, otherwise every comment under the same heading
+        counts as fuzzy.
+        """
+        if file_path != self._comment_counts_file:
+            self.load_comment_counts(file_path)
+
+        heading, content_hash = self.cell_key(cell_content)
+        counts = self._comment_counts
+        exact = counts.get((heading, content_hash, 'exact'), 0)
+        stored_fuzzy = counts.get((heading, content_hash, 'fuzzy'), 0)
+        if exact or stored_fuzzy:
+            return exact + stored_fuzzy, stored_fuzzy
+
+        fuzzy = sum(count for (h, _, _), count in counts.items() if h == heading)
+        return fuzzy, fuzzy
 
     def add_comment(self, file_path: str, cell_content: str, cell_index: int, comment_text: str) -> bool:
-        heading = self.extract_heading(cell_content)
-        content_hash = self.get_cell_hash(cell_content)
+        heading, content_hash = self.cell_key(cell_content)
 
         try:
-            self.cursor.execute(
-                '''INSERT INTO comments
-                   (file_path, heading_text, content_hash, cell_index, comment_text, match_confidence)
-                   VALUES (?, ?, ?, ?, ?, ?)''',
-                (file_path, heading, content_hash, cell_index, comment_text, 'exact')
-            )
-            self.conn.commit()
+            with self.conn:
+                self.cursor.execute(
+                    '''INSERT INTO comments
+                       (file_path, heading_text, content_hash, cell_index, comment_text, match_confidence)
+                       VALUES (?, ?, ?, ?, ?, ?)''',
+                    (file_path, heading, content_hash, cell_index, comment_text, 'exact')
+                )
+            if file_path == self._comment_counts_file:
+                key = (heading, content_hash, 'exact')
+                self._comment_counts[key] = self._comment_counts.get(key, 0) + 1
+                # Fuzzy matches for other cells under this heading change too
+                for cached_key in [k for k in self._comments_cache if k[0] == heading]:
+                    del self._comments_cache[cached_key]
             return True
         except Exception as exc:  # pylint: disable=broad-except
             print(f"DEBUG: Error inserting comment: {exc}")
@@ -49,14 +49,16 @@ class NavigationStateMixin:
         self.favorites_open_paths = set(favorites_open)
         self.favorites_selected_path = favorites_selected
 
-        self.save_setting('tree_state', json.dumps({
-            'open_paths': tree_open,
-            'selected_path': tree_selected
-        }))
-        self.save_setting('favorites_state', json.dumps({
-            'open_paths': favorites_open,
-            'selected_path': favorites_selected
-        }))
+        self.save_settings({
+            'tree_state': json.dumps({
+                'open_paths': tree_open,
+                'selected_path': tree_selected
+            }),
+            'favorites_state': json.dumps({
+                'open_paths': favorites_open,
+                'selected_path': favorites_selected
+            }),
+        })
 
     def collect_open_paths(self, tree):
         open_paths = []
@@ -77,7 +79,7 @@ class NavigationStateMixin:
         selection = tree.selection()
         if not selection:
             return None
-        values = tree.item(selection[0]).get('values')
+        values = tree.item(selection[0], 'values')
         return values[0] if values else None
 
     def restore_navigation_state(self) -> None:
@@ -101,7 +103,7 @@ class NavigationStateMixin:
         stack = list(tree.get_children(''))
         while stack:
             node = stack.pop()
-            values = tree.item(node).get('values')
+            values = tree.item(node, 'values')
             if values and values[0] == target_path:
                 return node
             stack.extend(tree.get_children(node))